@@ -0,0 +1,267 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage; peak RSS is then left out
+    resource = None
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_extraction_dir = os.path.join(_script_dir, 'data_extraction_scripts')
+sys.path[:0] = [_script_dir, _extraction_dir]
+
+# Repository root, holding the 'raw data' and 'refined data' fixtures
+DEFAULT_DATA_DIR = os.path.join(_script_dir, os.pardir)
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+# Durations this close are within timer noise, whatever their ratio
+_NOISE_SECONDS = 0.005
+
+
+def _refined_files(directory):
+    """Returns every refined netlist below a directory, in a stable order."""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith('.txt'))
+    return paths
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def bench_extract(data_dir, format_name):
+    """Extracts every raw file of one source format into a scratch folder."""
+    from extract_all_netlists import EXTRACTORS
+    import importlib
+    module_name, raw_subdir, _, _ = EXTRACTORS[format_name]
+    module = importlib.import_module(module_name)
+    seconds = size = blocks = 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        for input_paths, output_path in module.find_jobs(os.path.join(data_dir, 'raw data', raw_subdir), output_dir):
+            start = time.perf_counter()
+            netlist = module.extract(input_paths, output_path)
+            seconds += time.perf_counter() - start
+            size += sum(os.path.getsize(path) for path in input_paths)
+            blocks += netlist.num_blocks
+    return [(f'extract_{format_name}', seconds, size, blocks)]
+
+
+def bench_refined(data_dir):
+    """Reads every refined netlist with duplicates, then writes them back to a scratch folder."""
+    from netlist import Netlist
+    paths = _refined_files(os.path.join(data_dir, 'refined data', 'extracted data with duplicates'))
+    size = sum(os.path.getsize(path) for path in paths)
+    start = time.perf_counter()
+    netlists = [Netlist.read_refined(path) for path in paths]
+    read_seconds = time.perf_counter() - start
+    blocks = sum(netlist.num_blocks for netlist in netlists)
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        for i, netlist in enumerate(netlists):
+            netlist.write_refined(os.path.join(output_dir, f'{i}.txt'))
+        write_seconds = time.perf_counter() - start
+    return [('read_refined', read_seconds, size, blocks), ('write_refined', write_seconds, size, blocks)]
+
+
+def bench_remove_duplicates(data_dir):
+    """Deduplicates the refined netlists with duplicates into a scratch folder."""
+    from remove_duplicates import remove_duplicates
+    from netlist import Netlist
+    source_dir = os.path.join(data_dir, 'refined data', 'extracted data with duplicates')
+    paths = _refined_files(source_dir)
+    size = sum(os.path.getsize(path) for path in paths)
+    blocks = sum(Netlist.read_refined(path).num_blocks for path in paths)
+    with tempfile.TemporaryDirectory() as target_dir:
+        start = time.perf_counter()
+        remove_duplicates(source_dir, target_dir)
+        seconds = time.perf_counter() - start
+    return [('remove_duplicates', seconds, size, blocks)]
+
+
+def bench_statistics(data_dir):
+    """Summarizes the deduplicated refined netlists without the parse cache."""
+    from generate_statistics_extracted_data import summarize_files
+    from netlist import Netlist
+    paths = _refined_files(os.path.join(data_dir, 'refined data', 'extracted data without duplicates'))
+    size = sum(os.path.getsize(path) for path in paths)
+    blocks = sum(Netlist.read_refined(path).num_blocks for path in paths)
+    start = time.perf_counter()
+    summarize_files(paths)
+    return [('statistics', time.perf_counter() - start, size, blocks)]
+
+
+def bench_synthetic(data_dir, num_blocks):
+    """Generates a synthetic netlist of num_blocks blocks, writes it and reads it back."""
+    import numpy as np
+    from data_augmentation import generate_netlist, load_sampler
+    from netlist import Netlist
+    num_blocks = int(num_blocks)
+    sampler = load_sampler()
+    start = time.perf_counter()
+    netlist = generate_netlist(num_blocks, sampler, np.random.default_rng(0))
+    generate_seconds = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as output_dir:
+        path = os.path.join(output_dir, 'synthetic.txt')
+        start = time.perf_counter()
+        netlist.write_refined(path)
+        write_seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        Netlist.read_refined(path)
+        read_seconds = time.perf_counter() - start
+    return [(f'synthetic_generate_{num_blocks}', generate_seconds, None, num_blocks),
+            (f'synthetic_write_{num_blocks}', write_seconds, size, num_blocks),
+            (f'synthetic_read_{num_blocks}', read_seconds, size, num_blocks)]
+
+
+# Benchmark of every group of stages, each run in a process of its own so that its peak RSS is its own
+GROUPS = {
+    'extract': bench_extract,
+    'refined': bench_refined,
+    'remove_duplicates': bench_remove_duplicates,
+    'statistics': bench_statistics,
+    'synthetic': bench_synthetic,
+}
+
+EXTRACT_FORMATS = ('SMU', 'UM', 'Corblivar', 'Bookshelf', 'HotSpot', 'DeepMind')
+
+
+def run_group(data_dir, group, argument, repeat):
+    """
+    Runs one group of stages repeat times in this process and returns the record of every stage:
+    its best time, its throughput in MB/s (when it reads or writes files) and blocks/s, and the peak RSS
+    of the process. The stages of a group share their process, so they share that group peak RSS too.
+    """
+    benchmark = GROUPS[group]
+    arguments = (data_dir,) if argument is None else (data_dir, argument)
+    best = {}
+    for _ in range(repeat):
+        # The pipeline stages report every file they handle; only the measurements are wanted here
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = benchmark(*arguments)
+        for name, seconds, size, blocks in results:
+            if name not in best or seconds < best[name][0]:
+                best[name] = (seconds, size, blocks)
+
+    peak_rss = _peak_rss_mb()
+    records = []
+    for name, (seconds, size, blocks) in best.items():
+        rate = max(seconds, 1e-9)
+        record = {'stage': name, 'seconds': round(seconds, 6), 'blocks': blocks,
+                  'blocks_per_s': round(blocks / rate, 1)}
+        if size is not None:
+            record.update(bytes=size, mb_per_s=round(size / 1e6 / rate, 3))
+        if peak_rss is not None:
+            record['group_peak_rss_mb'] = round(peak_rss, 1)
+        records.append(record)
+    return records
+
+
+def run_isolated(data_dir, group, argument, repeat):
+    """Runs a group of stages in a fresh interpreter and returns its records."""
+    command = [sys.executable, os.path.abspath(__file__), '--data-dir', data_dir, '--repeat', str(repeat),
+               '--run-group', group] + ([] if argument is None else [str(argument)])
+    completed = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark group {group} {argument or ''} failed with exit code {completed.returncode}")
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def compare(records, baseline, threshold):
+    """
+    Compares records against baseline records of the same stages. A stage regresses when it takes more than
+    (1 + threshold) times its baseline time, beyond timer noise, or the peak RSS of its group grows by more
+    than that factor.
+    Returns a list of regression messages.
+    """
+    previous = {record['stage']: record for record in baseline}
+    regressions = []
+    for record in records:
+        old = previous.get(record['stage'])
+        if old is None:
+            continue
+        if record['seconds'] > old['seconds'] * (1 + threshold) + _NOISE_SECONDS:
+            regressions.append(f"{record['stage']}: {record['seconds']:.4f} s, baseline {old['seconds']:.4f} s "
+                               f"({record['seconds'] / max(old['seconds'], 1e-9) - 1:+.0%})")
+        if record.get('group_peak_rss_mb') and old.get('group_peak_rss_mb') and \
+                record['group_peak_rss_mb'] > old['group_peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{record['stage']}: group peak RSS {record['group_peak_rss_mb']:.1f} MB, "
+                               f"baseline {old['group_peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def format_record(record):
+    throughput = f"{record['mb_per_s']:10.2f} MB/s" if 'mb_per_s' in record else ' ' * 15
+    rss = f"{record['group_peak_rss_mb']:9.1f} MB group RSS" if 'group_peak_rss_mb' in record else ''
+    return (f"{record['stage']:32s} {record['seconds']:10.4f} s {throughput} "
+            f"{record['blocks_per_s']:14.0f} blocks/s {rss}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parsers, deduplication, statistics and "
+                                                 "synthetic netlist generation on the checked-in data.")
+    parser.add_argument("--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS),
+                        help="Groups of stages to run (default: all).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Numbers of blocks of the synthetic netlists (default: 1000 10000 100000 1000000).")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs of every stage; the fastest one is reported (default: 3).")
+    parser.add_argument("--data-dir", type=str, default=DEFAULT_DATA_DIR,
+                        help="Directory holding 'raw data' and 'refined data' (default: the repository root).")
+    parser.add_argument("--baseline", type=str, default=None, help="Results JSON of an earlier run to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Slowdown or group peak RSS growth flagged as a regression, as a fraction "
+                             "(default: 0.1).")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Path to write the results JSON to, usable as a later --baseline.")
+    parser.add_argument("--run-group", nargs="+", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_group:
+        group, argument = args.run_group[0], (args.run_group[1] if len(args.run_group) > 1 else None)
+        print(json.dumps(run_group(args.data_dir, group, argument, args.repeat)))
+        sys.exit(0)
+
+    runs = []
+    for group in args.groups:
+        if group == 'extract':
+            runs.extend((group, format_name) for format_name in EXTRACT_FORMATS)
+        elif group == 'synthetic':
+            runs.extend((group, size) for size in args.sizes)
+        else:
+            runs.append((group, None))
+
+    records = []
+    for group, argument in runs:
+        for record in run_isolated(os.path.abspath(args.data_dir), group, argument, args.repeat):
+            print(format_record(record))
+            records.append(record)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'stages': records}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(records, json.load(f)['stages'], args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        print(f"{len(regressions)} regressions beyond {args.threshold:.0%} against {args.baseline}")
+        if regressions:
+            sys.exit(1)
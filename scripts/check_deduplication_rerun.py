@@ -0,0 +1,69 @@
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from remove_duplicates import remove_duplicates
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SOURCE_DIR = os.path.join(_script_dir, os.pardir, 'refined data', 'extracted data with duplicates')
+
+
+def _netlists(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.txt'))
+
+
+def _run(source_dir, target_dir):
+    """Runs remove_duplicates quietly and returns the netlists left in target_dir."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        remove_duplicates(source_dir, target_dir)
+    return _netlists(target_dir)
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    return condition
+
+
+def check_rerun(source_dir, work_dir):
+    """
+    Deduplicates source_dir into an empty folder, then again into a folder that an earlier run filled with
+    every netlist, duplicates included, and once more on top of that. All runs must leave the same survivors,
+    identical to their sources.
+    """
+    clean, stale = os.path.join(work_dir, 'clean'), os.path.join(work_dir, 'stale')
+    survivors = _run(source_dir, clean)
+    os.makedirs(stale)
+    for root, _, names in os.walk(source_dir):
+        for name in names:
+            if name.endswith('.txt'):
+                shutil.copy2(os.path.join(root, name), os.path.join(stale, name))
+    seeded = len(_netlists(stale))
+    rerun = _run(source_dir, stale)
+    second_rerun = _run(source_dir, stale)
+    return all([
+        check(survivors and len(survivors) < seeded, f"{len(survivors)} survivors of {seeded} netlists"),
+        check(rerun == survivors, "a rerun over stale outputs leaves the same survivors"),
+        check(second_rerun == survivors, "a second rerun leaves the same survivors"),
+        check(all(filecmp.cmp(os.path.join(clean, name), os.path.join(stale, name), shallow=False)
+                  for name in survivors), "survivors are identical across runs"),
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that rerunning remove_duplicates.py over the outputs of "
+                                                 "an earlier run leaves exactly the survivors of a fresh run.")
+    parser.add_argument("--source-dir", type=str, default=DEFAULT_SOURCE_DIR,
+                        help="Refined netlists with duplicates (default: refined data/extracted data with "
+                             "duplicates).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        passed = check_rerun(args.source_dir, work_dir)
+    print("All checks passed" if passed else "Some checks failed")
+    sys.exit(0 if passed else 1)
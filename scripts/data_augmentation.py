@@ -1,67 +1,168 @@
 import os
-import random
+from concurrent.futures import ProcessPoolExecutor
 
-# Statistics
-width_avg = 132.17
-width_q1 = 23.00
-width_q3 = 44.00
-width_med = 34.00
+import numpy as np
 
-power_avg = 0.46
-power_q1 = 0.01
-power_q3 = 0.07
-power_med = 0.02
+import instrumentation
+from distributions import DEFAULT_DISTRIBUTIONS, BlockSampler
+from netlist import Netlist
 
-aspect_ratio_avg = 1.22
-aspect_ratio_q1 = 0.68
-aspect_ratio_q3 = 1.54
-aspect_ratio_med = 1.00
+# Rent exponent of the generated connectivity, typical of random logic
+rent_exponent = 0.6
 
 def generate_block_name(index):
     return f"bk{index}"
 
-def generate_block_data():
-    # Generate realistic dimensions and power within the range
-    width = random.uniform(width_q1, width_q3)
-    height = width * random.uniform(aspect_ratio_q1, aspect_ratio_q3)
-    power = random.uniform(power_q1, power_q3)
-    return f"{generate_block_name(random.randint(1, 999))}, {int(width)}, {int(height)}, {round(power, 2)}"
+# Samplers of the distribution artifacts loaded by this process, by path
+_samplers = {}
+
+def load_sampler(distributions_path=DEFAULT_DISTRIBUTIONS):
+    """Returns the BlockSampler of a distribution artifact written by generate_statistics_extracted_data.py."""
+    if distributions_path not in _samplers:
+        _samplers[distributions_path] = BlockSampler.load(distributions_path)
+    return _samplers[distributions_path]
+
+def generate_block_data(rng, num_blocks, sampler):
+    """
+    Draws num_blocks blocks at once from the distributions of the refined netlists:
+    their names, and arrays of their integer dimensions and power.
+    """
+    names = [generate_block_name(index) for index in range(1, num_blocks + 1)]
+    width, height, power = sampler.sample_blocks(rng, num_blocks)
+    return names, np.maximum(np.trunc(width), 1), np.maximum(np.trunc(height), 1), np.round(power, 2)
 
 def generate_connection_name(index):
     return f"C_{index}"
 
-def generate_connection_data(num_blocks):
-    net_name = generate_connection_name(random.randint(0, num_blocks))
-    connected_blocks = " ".join(
-        generate_block_name(random.randint(1, num_blocks)) for _ in range(random.randint(2, 10))
-    )
-    return f"{net_name} {connected_blocks};"
+def generate_connection_data(rng, num_blocks, num_connections, sampler, rent_exponent=rent_exponent):
+    """
+    Draws num_connections nets over the blocks 0..num_blocks-1 with a hierarchical locality model.
+
+    The blocks are the leaves of a recursive bisection, so the clusters of level L are aligned runs
+    of 2**L blocks. Each net has a random driver, and each of its other pins lies in the sibling of the
+    driver's level-(L - 1) cluster, at a level L that exceeds l with probability 2**(l * (p - 1)).
+    A cluster of C blocks thus has its nets leave it through about C**p pins (Rent's rule with exponent p).
+    Levels start at log2 of the net degree so that large nets are not crowded into a few blocks.
+    Everything is drawn in O(pins), apart from a sort that drops pins drawn twice in a net.
+    Returns the net names, the CSR offsets of their pins and the pins as block indices.
+    """
+    # Degrees from the degree distribution of the refined netlists, capped at the number of blocks
+    degrees = np.minimum(sampler.sample_degrees(rng, num_connections), num_blocks)
+    drivers = rng.integers(0, num_blocks, num_connections)
+    offsets = np.concatenate(([0], np.cumsum(degrees)))
+    net_of_pin = np.repeat(np.arange(num_connections), degrees)
+    num_pins = int(offsets[-1])
+
+    # Level of every pin by inverting its survival function, above the net's minimum level
+    top_level = max(1, int(np.ceil(np.log2(num_blocks))))
+    min_levels = np.floor(np.log2(degrees)).astype(np.int64)[net_of_pin]
+    with np.errstate(divide='ignore'):
+        levels = np.floor(np.log2(1 - rng.random(num_pins)) / (rent_exponent - 1)).astype(np.int64) + 1
+    levels = np.minimum(levels + min_levels, top_level)
+
+    # Uniform position in the sibling half of the driver's level-L cluster
+    half = np.int64(1) << (levels - 1)
+    driver_of_pin = drivers[net_of_pin]
+    sibling_starts = ((driver_of_pin >> (levels - 1)) ^ 1) << (levels - 1)
+    pins = sibling_starts + (rng.random(num_pins) * half).astype(np.int64)
+    # Past the last block, fall back to the driver's own half, then wrap around
+    pins = np.where(pins >= num_blocks, pins ^ half, pins) % num_blocks
+    pins[offsets[:-1]] = drivers
 
-def generate_file_content(num_blocks):
-    content = ["Blocks:"]
-    for _ in range(num_blocks):
-        content.append(generate_block_data())
+    # Drop pins drawn twice in a net, keeping the pin order
+    order = np.lexsort((pins, net_of_pin))
+    repeated = np.zeros(num_pins, dtype=bool)
+    repeated[order[1:]] = (pins[order[1:]] == pins[order[:-1]]) & (net_of_pin[order[1:]] == net_of_pin[order[:-1]])
+    pins = pins[~repeated]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(net_of_pin[~repeated], minlength=num_connections))))
 
-    num_connections = random.randint(10, 50)
-    content.append("\nConnections:")
-    for i in range(num_connections):
-        content.append(generate_connection_data(num_blocks))
+    net_names = [generate_connection_name(index) for index in range(num_connections)]
+    return net_names, offsets, pins
 
-    return "\n".join(content)
+def generate_netlist(num_blocks, sampler, rng=None, rent_exponent=rent_exponent, nets_per_block=None):
+    """
+    Generates a Netlist of num_blocks blocks from a BlockSampler, drawing from rng
+    (a fresh unseeded generator by default). nets_per_block defaults to that of the refined netlists.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if nets_per_block is None:
+        nets_per_block = sampler.nets_per_block
+    names, width, height, power = generate_block_data(rng, num_blocks, sampler)
+    num_connections = max(1, round(nets_per_block * num_blocks)) if num_blocks > 1 else 0
+    net_names, offsets, pins = generate_connection_data(rng, num_blocks, num_connections, sampler, rent_exponent)
+    return Netlist(names, num_blocks, width, height, power, net_names, offsets, pins)
+
+def generate_file(file_name, min_blocks, max_blocks, seed_sequence, distributions_path=DEFAULT_DISTRIBUTIONS,
+                  rent_exponent=rent_exponent, nets_per_block=None):
+    """Generates one file from its own random stream and returns its number of blocks."""
+    rng = np.random.default_rng(seed_sequence)
+    num_blocks = int(rng.integers(min_blocks, max_blocks + 1))
+    with instrumentation.span('generate'):
+        netlist = generate_netlist(num_blocks, load_sampler(distributions_path), rng, rent_exponent, nets_per_block)
+        instrumentation.count_netlist(netlist)
+    netlist.write_refined(file_name)
+    return num_blocks
+
+def main(output_dir, num_files=50, min_blocks=30, max_blocks=300, seed=None, workers=1,
+         distributions_path=DEFAULT_DISTRIBUTIONS, rent_exponent=rent_exponent, nets_per_block=None):
+    """
+    Generates num_files netlists of min_blocks to max_blocks blocks, sampled from the distribution artifact
+    that generate_statistics_extracted_data.py writes next to its statistics.
+    Every file draws from its own stream spawned from the seed, so the output only depends on the seed
+    and the file index, however many workers (None for all cores) share the work.
+    """
+    if not os.path.isfile(distributions_path):
+        print(f"Error: {distributions_path} does not exist. "
+              f"Run generate_statistics_extracted_data.py on the refined data first.")
+        return
+    load_sampler(distributions_path)
 
-def main(output_dir):
     os.makedirs(output_dir, exist_ok=True)
-    for i in range(50):
-        file_name = os.path.join(output_dir, f"generated_netlist_{i+1}.txt")
-        num_blocks = random.randint(30, 300)
-        file_content = generate_file_content(num_blocks)
-        with open(file_name, "w") as f:
-            f.write(file_content)
-    print(f"Generated 50 files in {output_dir}")
+    seed_sequence = np.random.SeedSequence(seed)
+    file_names = [os.path.join(output_dir, f"generated_netlist_{i+1}.txt") for i in range(num_files)]
+    jobs = (file_names, [min_blocks] * num_files, [max_blocks] * num_files, seed_sequence.spawn(num_files),
+            [distributions_path] * num_files, [rent_exponent] * num_files, [nets_per_block] * num_files)
+
+    if workers == 1 or num_files <= 1:
+        total_blocks = sum(map(generate_file, *jobs))
+    else:
+        # Files are handed out in chunks to amortize the inter-process overhead of small files
+        chunksize = max(1, num_files // (8 * (workers or os.cpu_count())))
+        worker_settings = instrumentation.settings()
+        total_blocks = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for num_blocks, state in executor.map(instrumentation.call, [worker_settings] * num_files,
+                                                  [generate_file] * num_files, *jobs, chunksize=chunksize):
+                instrumentation.absorb(state)
+                total_blocks += num_blocks
+    print(f"Generated {num_files} files with {total_blocks} blocks in {output_dir} (seed {seed_sequence.entropy})")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Generate test files.")
     parser.add_argument("output_path", type=str, help="Output directory for the files.")
+    parser.add_argument("--num-files", type=int, default=50, help="Number of netlists to generate (default: 50).")
+    parser.add_argument("--min-blocks", type=int, default=30,
+                        help="Minimum number of blocks per netlist (default: 30).")
+    parser.add_argument("--max-blocks", type=int, default=300,
+                        help="Maximum number of blocks per netlist (default: 300).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the run; the seed of an unseeded run is printed so it can be reproduced.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes; 0 uses all cores (default: 1).")
+    parser.add_argument("--rent-exponent", type=float, default=rent_exponent,
+                        help=f"Rent exponent of the generated connectivity (default: {rent_exponent}).")
+    parser.add_argument("--nets-per-block", type=float, default=None,
+                        help="Number of nets per block (default: that of the refined netlists).")
+    parser.add_argument("--distributions", type=str, default=DEFAULT_DISTRIBUTIONS,
+                        help="Distribution artifact written by generate_statistics_extracted_data.py "
+                             "(default: the one in 'statistics of refined data').")
+    instrumentation.add_arguments(parser)
     args = parser.parse_args()
-    main(args.output_path)
+    if args.report:
+        instrumentation.enable(args.trace_memory)
+    main(args.output_path, args.num_files, args.min_blocks, args.max_blocks, args.seed, args.workers or None,
+         args.distributions, args.rent_exponent, args.nets_per_block)
+    if args.report:
+        instrumentation.write_report(args.report, script='data_augmentation')
+
@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+from downloader import FILE_MODE, download_github_folder
+from raw_store import refresh_github_folder
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Fixture served by default: a small checked-in raw data folder
+DEFAULT_FIXTURE = os.path.join(_script_dir, os.pardir, os.pardir, 'raw data', 'HotSpot')
+
+
+class FixtureServer:
+    """
+    Local stand-in for GitHub: serves a folder's listing as a contents API response at /api and its files
+    at /files/<name>, both with ETags answered by 304 on a matching If-None-Match. Every response status is logged.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.statuses = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/api':
+                    body = json.dumps([{'type': 'file', 'name': name,
+                                        'download_url': f"{server.url}/files/{quote(name)}"}
+                                       for name in sorted(os.listdir(folder))
+                                       if os.path.isfile(os.path.join(folder, name))]).encode()
+                else:
+                    path = os.path.join(folder, unquote(self.path[len('/files/'):]))
+                    if not self.path.startswith('/files/') or not os.path.isfile(path):
+                        return self.respond(404, b'')
+                    with open(path, 'rb') as f:
+                        body = f.read()
+                etag = '"' + hashlib.sha256(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self.respond(304, None, {'ETag': etag})
+                self.respond(200, body, {'ETag': etag})
+
+            def respond(self, status, body, headers=()):
+                server.statuses.append((self.path, status))
+                self.send_response(status)
+                for name, value in dict(headers).items():
+                    self.send_header(name, value)
+                if body is not None:
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def file_statuses(self):
+        """Returns and forgets the statuses of the file requests so far."""
+        statuses = [status for path, status in self.statuses if path.startswith('/files/')]
+        self.statuses.clear()
+        return statuses
+
+
+def _snapshot(folder):
+    """Content hash, mode and mtime of every file below a folder."""
+    states = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            info = os.stat(path)
+            with open(path, 'rb') as f:
+                states[os.path.relpath(path, folder)] = (hashlib.sha256(f.read()).hexdigest(),
+                                                        stat.S_IMODE(info.st_mode), info.st_mtime_ns)
+    return states
+
+
+def check(condition, message):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    return condition
+
+
+def check_downloader(server, fixture, work_dir):
+    """Downloads the fixture folder straight into a folder and compares it with the fixture."""
+    target = os.path.join(work_dir, 'direct')
+    failed = download_github_folder(f"{server.url}/api", target, workers=4)
+    statuses = server.file_statuses()
+    downloaded, expected = _snapshot(target), _snapshot(fixture)
+    return all([
+        check(not failed and statuses and all(status == 200 for status in statuses),
+              f"downloader fetched {len(statuses)} files with 200"),
+        check({name: state[0] for name, state in downloaded.items()}
+              == {name: state[0] for name, state in expected.items()}, "downloaded files match the fixture"),
+        check(all(state[1] == FILE_MODE for state in downloaded.values()),
+              f"downloaded files have mode {FILE_MODE:o}"),
+    ])
+
+
+def check_store(server, fixture, work_dir):
+    """
+    Refreshes the fixture folder through a raw store twice. The second refresh must get nothing but 304s
+    and leave the store and the materialized folder untouched.
+    """
+    target, store_dir = os.path.join(work_dir, 'stored'), os.path.join(work_dir, '.store')
+    failed = refresh_github_folder(f"{server.url}/api", target, store_dir=store_dir, workers=4)
+    first = server.file_statuses()
+    before = (_snapshot(target), _snapshot(store_dir))
+    failed += refresh_github_folder(f"{server.url}/api", target, store_dir=store_dir, workers=4)
+    second = [status for _, status in server.statuses]
+    server.statuses.clear()
+    after = (_snapshot(target), _snapshot(store_dir))
+    return all([
+        check(not failed and first and all(status == 200 for status in first),
+              f"first refresh fetched {len(first)} files with 200"),
+        check({name: state[0] for name, state in after[0].items()}
+              == {name: state[0] for name, state in _snapshot(fixture).items()}, "refreshed files match the fixture"),
+        check(all(state[1] == FILE_MODE for snapshot in after for state in snapshot.values()),
+              f"refreshed files and store files have mode {FILE_MODE:o}"),
+        check(second and all(status == 304 for status in second),
+              f"second refresh got {len(second)} answers, all 304"),
+        check(before == after, "second refresh wrote nothing"),
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the downloads offline against a local server that serves "
+                                                 "a fixture folder the way GitHub does.")
+    parser.add_argument("--fixture", type=str, default=DEFAULT_FIXTURE,
+                        help="Folder to serve (default: raw data/HotSpot).")
+    args = parser.parse_args()
+
+    with FixtureServer(args.fixture) as server, tempfile.TemporaryDirectory() as work_dir:
+        passed = check_downloader(server, args.fixture, work_dir)
+        passed = check_store(server, args.fixture, work_dir) and passed
+    print("All checks passed" if passed else "Some checks failed")
+    sys.exit(0 if passed else 1)
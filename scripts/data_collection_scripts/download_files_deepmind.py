@@ -1,42 +1,46 @@
-import requests
-import os
 import argparse
+import os
+import sys
+
+from downloader import download_file, make_session
+from raw_store import RawStore, default_store_dir
 
 # URL to the raw file on GitHub
 file_url = "https://raw.githubusercontent.com/google-research/circuit_training/main/circuit_training/environment/test_data/simple_with_coords/netlist.pb.txt"
 
+# File name
+file_name = "DeepMind_data.txt"
 
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Specify the output directory for the downloaded file.")
+    parser.add_argument("output_dir", help="Target directory to save the file")
+    parser.add_argument("--url", default=file_url, help="URL of the netlist to download (default: the Circuit Training example).")
+    parser.add_argument("--store", default=None,
+                        help="Directory of the content-addressed raw store "
+                             "(default: .store next to the output directory).")
+    parser.add_argument("--no-store", action="store_true",
+                        help="Download the file straight into the output directory, bypassing the store.")
+    args = parser.parse_args()
 
+    # Target directory from terminal argument
+    target_directory = args.output_dir
+    os.makedirs(target_directory, exist_ok=True)
 
+    print(f"Target directory is set to: {target_directory}")
+    print(f"Downloading {file_name} from {args.url}")
 
-parser = argparse.ArgumentParser(description="Specify the output directory for the downloaded file.")
-parser.add_argument("output_dir", help="Target directory to save the file")
-args = parser.parse_args()
-
-# Target directory from terminal argument
-target_directory = args.output_dir
-os.makedirs(target_directory, exist_ok=True)
-
-
-# File name
-file_name = "DeepMind_data.txt"
-
-print(f"Target directory is set to: {target_directory}")
-print(f"Downloading {file_name} from {file_url}")
-
-try:
-    # Download the file
-    file_response = requests.get(file_url)
-    
-    if file_response.status_code == 200:
-        # Save the file to the target directory
+    try:
         target_path = os.path.join(target_directory, file_name)
-        with open(target_path, "wb") as f:
-            f.write(file_response.content)
-        print(f"Successfully downloaded and saved: {file_name}")
-    else:
-        print(f"Failed to download {file_name}. HTTP Status: {file_response.status_code}")
-
-except Exception as e:
-    print(f"An error occurred: {e}")
+        with make_session(1) as session:
+            if args.no_store:
+                size = download_file(session, args.url, target_path)
+                print(f"Successfully downloaded and saved: {file_name} ({size} bytes)")
+            else:
+                with RawStore(args.store or default_store_dir(target_directory)) as store:
+                    if store.materialize(store.fetch(session, args.url), target_path):
+                        print(f"Updated {file_name}")
+                    print(store.report())
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Mode open() would give a new file; mkstemp creates files readable by their owner only
+_umask = os.umask(0)
+os.umask(_umask)
+FILE_MODE = 0o666 & ~_umask
+
+
+def make_session(pool_size=8):
+    """Returns a requests Session whose connection pool holds pool_size connections per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def with_retries(request, retries=3, backoff=0.5):
+    """
+    Calls request() until it succeeds. Connection errors, timeouts, broken bodies and retryable statuses
+    are retried with exponential backoff; other HTTP errors are raised right away.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return request()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError,
+                requests.exceptions.ChunkedEncodingError) as e:
+            status = e.response.status_code if getattr(e, "response", None) is not None else None
+            if attempt == retries or (status is not None and status not in RETRY_STATUSES):
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def write_stream(response, target_path, chunk_size=1 << 16, digest=None):
+    """
+    Streams a response body into target_path in chunks, updating digest if given. The body goes to a
+    temporary file next to the target, which is renamed over it once complete, so an interrupted
+    download never leaves a partial file. Returns the number of bytes written.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target_path)), suffix=".part")
+    try:
+        os.chmod(temp_path, FILE_MODE)
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+                size += len(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return size
+
+
+def download_file(session, url, target_path, retries=3, backoff=0.5, timeout=30, chunk_size=1 << 16):
+    """
+    Streams url into target_path, retrying transient failures with exponential backoff.
+    Returns the number of bytes written.
+    """
+    def attempt():
+        with session.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            return write_stream(response, target_path, chunk_size)
+
+    return with_retries(attempt, retries, backoff)
+
+
+def list_github_folder(session, api_url, timeout=30):
+    """
+    Returns the (file name, download URL) pairs of the files in a GitHub contents API folder listing.
+    Subfolders are skipped.
+    """
+    response = session.get(api_url, timeout=timeout)
+    response.raise_for_status()
+    files = []
+    for entry in response.json():
+        if entry["type"] == "file":  # Only download actual files, not directories
+            files.append((entry["name"], entry["download_url"]))
+        else:
+            print(f"Skipping directory: {entry['name']}")
+    return files
+
+
+def download_all(session, files, target_directory, workers=8, **download_options):
+    """
+    Downloads the (file name, URL) pairs into target_directory over at most workers concurrent requests.
+    Returns the names of the files that failed.
+    """
+    os.makedirs(target_directory, exist_ok=True)
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(download_file, session, url, os.path.join(target_directory, name),
+                                   **download_options): name
+                   for name, url in files}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                size = future.result()
+                print(f"Successfully downloaded and saved: {name} ({size} bytes)")
+            except Exception as e:
+                failed.append(name)
+                print(f"Failed to download {name}: {e}")
+    return failed
+
+
+def download_github_folder(api_url, target_directory, workers=8):
+    """Downloads every file of a GitHub folder into target_directory. Returns the names that failed."""
+    print(f"Target directory is set to: {target_directory}")
+    with make_session(workers) as session:
+        files = list_github_folder(session, api_url)
+        if not files:
+            print("No files found in the folder.")
+            return []
+        print(f"Downloading {len(files)} files from {api_url} with {workers} concurrent requests")
+        return download_all(session, files, target_directory, workers)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from downloader import FILE_MODE, make_session, with_retries, write_stream
+
+
+def default_store_dir(target_directory):
+    """Returns the store shared by every source: a .store folder next to the source folders of raw data."""
+    return os.path.join(os.path.dirname(os.path.abspath(target_directory)), ".store")
+
+
+class RawStore:
+    """
+    Content-addressed store of downloaded raw files.
+
+    Blobs are kept under their SHA-256, and a manifest records for every source URL the blob it
+    last resolved to along with its ETag, Last-Modified date and size. Refreshes send conditional
+    requests built from the manifest, so unchanged files are neither transferred nor written,
+    and raw data folders are materialized from the blobs through hardlinks.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.blob_dir = os.path.join(store_dir, "blobs")
+        self.manifest_path = os.path.join(store_dir, "manifest.json")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+        self._saved = json.dumps(self.manifest, sort_keys=True)
+        self._lock = threading.Lock()
+        self.transferred = 0
+        self.not_modified = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.save()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256[:2], sha256)
+
+    def fetch(self, session, url, retries=3, backoff=0.5, timeout=30):
+        """
+        Makes sure the store holds the current content of url and returns its SHA-256.
+        A known URL is requested conditionally, and a 304 answer costs neither a transfer nor a write.
+        """
+        entry = self.manifest.get(url)
+        headers = {}
+        if entry and os.path.exists(self.blob_path(entry["sha256"])):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        def attempt():
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 304:
+                    return None
+                response.raise_for_status()
+                # Staged under a name of its own until the hash of the content is known
+                digest = hashlib.sha256()
+                staging_path = os.path.join(self.blob_dir, f"{os.getpid()}-{threading.get_ident()}.download")
+                size = write_stream(response, staging_path, digest=digest)
+                sha256 = digest.hexdigest()
+                blob_path = self.blob_path(sha256)
+                if os.path.exists(blob_path):
+                    os.remove(staging_path)
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(staging_path, blob_path)
+                return {"sha256": sha256, "size": size, "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified")}
+
+        new_entry = with_retries(attempt, retries, backoff)
+        with self._lock:
+            if new_entry is None:
+                self.not_modified += 1
+                return entry["sha256"]
+            self.transferred += 1
+            self.manifest[url] = new_entry
+        return new_entry["sha256"]
+
+    def read(self, sha256):
+        with open(self.blob_path(sha256), "rb") as f:
+            return f.read()
+
+    def materialize(self, sha256, target_path):
+        """
+        Places a blob at target_path as a hardlink, or a copy across file systems.
+        Returns False when target_path already is that blob.
+        """
+        blob_path = self.blob_path(sha256)
+        if os.path.exists(target_path) and os.path.samefile(blob_path, target_path):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(target_path)), exist_ok=True)
+        temp_path = f"{target_path}.{os.getpid()}-{threading.get_ident()}.part"
+        try:
+            os.link(blob_path, temp_path)
+        except OSError:
+            shutil.copy2(blob_path, temp_path)
+        os.replace(temp_path, target_path)
+        return True
+
+    def save(self):
+        """Writes the manifest back, unless nothing changed."""
+        text = json.dumps(self.manifest, sort_keys=True)
+        if text == self._saved:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        os.chmod(temp_path, FILE_MODE)
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+        self._saved = text
+
+    def report(self):
+        return f"Raw store: {self.transferred} transferred, {self.not_modified} not modified, in {self.store_dir}"
+
+
+def refresh_files(store, session, files, target_directory, workers=8):
+    """
+    Refreshes the (file name, URL) pairs through the store and materializes them into target_directory.
+    Returns the names of the files that failed.
+    """
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(store.fetch, session, url): name for name, url in files}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                if store.materialize(future.result(), os.path.join(target_directory, name)):
+                    print(f"Updated {name}")
+            except Exception as e:
+                failed.append(name)
+                print(f"Failed to download {name}: {e}")
+    return failed
+
+
+def refresh_github_folder(api_url, target_directory, store_dir=None, workers=8):
+    """
+    Refreshes every file of a GitHub folder into target_directory through the raw store.
+    The folder listing itself is fetched conditionally too. Returns the names of the files that failed.
+    """
+    print(f"Target directory is set to: {target_directory}")
+    with make_session(workers) as session, RawStore(store_dir or default_store_dir(target_directory)) as store:
+        files = []
+        for entry in json.loads(store.read(store.fetch(session, api_url))):
+            if entry["type"] == "file":  # Only download actual files, not directories
+                files.append((entry["name"], entry["download_url"]))
+            else:
+                print(f"Skipping directory: {entry['name']}")
+        failed = refresh_files(store, session, files, target_directory, workers)
+        print(store.report())
+    return failed
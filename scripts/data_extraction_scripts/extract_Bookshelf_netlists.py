@@ -0,0 +1,171 @@
+import os
+import re
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import instrumentation
+from netlist import NetlistBuilder
+from shape_curves import squarest_shapes
+
+# Bookshelf power files list densities in 10^6 W/m^2 (= uW/um^2)
+POWER_DENSITY_TO_WATTS = 1e-6
+
+_vertex_pattern = re.compile(r'\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\)')
+
+
+@instrumentation.timed('parse_blocks')
+def parse_blocks_file(blocks_file_path):
+    """
+    Parses a Bookshelf .blocks file.
+    Returns the blocks as (name, width, height) tuples in file order and the terminal names.
+    Soft blocks are given the shape closest to a square that their aspect ratio limits allow,
+    resolved for all of them at once once the file is read.
+    """
+    blocks = []
+    terminals = []
+    soft_indices = []
+    soft_limits = []  # (area, min_aspect, max_aspect) of every soft block
+    with open(blocks_file_path, 'r') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) < 2 or parts[0].startswith('#') or parts[1] == ':':
+                continue
+
+            name, block_type = parts[0], parts[1]
+            if block_type == 'hardrectilinear':
+                vertices = _vertex_pattern.findall(line)
+                xs = [float(x) for x, _ in vertices]
+                ys = [float(y) for _, y in vertices]
+                blocks.append((name, max(xs) - min(xs), max(ys) - min(ys)))
+            elif block_type == 'softrectangular':
+                soft_indices.append(len(blocks))
+                soft_limits.append((float(parts[2]), float(parts[3]), float(parts[4])))
+                blocks.append(name)  # Shaped below
+            elif block_type == 'terminal':
+                terminals.append(name)
+
+    if soft_limits:
+        area, min_aspect, max_aspect = np.array(soft_limits).T
+        width, height = squarest_shapes(area, min_aspect, max_aspect)
+        for index, block_width, block_height in zip(soft_indices, width.tolist(), height.tolist()):
+            blocks[index] = (blocks[index], block_width, block_height)
+    return blocks, terminals
+
+
+@instrumentation.timed('parse_power')
+def parse_power_file(power_file_path, blocks):
+    """
+    Parses a Bookshelf .power file, which lists one power density per block in .blocks order.
+    Returns a dictionary mapping block names to their power in watts.
+    """
+    densities = []
+    with open(power_file_path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                densities.append(float(line))
+
+    power_map = {}
+    for (name, width, height), density in zip(blocks, densities):
+        power_map[name] = density * width * height * POWER_DENSITY_TO_WATTS
+    return power_map
+
+
+@instrumentation.timed('parse_nets')
+def read_nets(nets_file_path, builder):
+    """
+    Streams a Bookshelf .nets file into a NetlistBuilder.
+    Only the pins of the current net are held as Python objects.
+    Returns the number of nets read.
+    """
+    num_nets = 0
+    pins = []
+    net_name = None
+    remaining = 0
+
+    with open(nets_file_path, 'r') as file:
+        for line in file:
+            parts = line.split()
+            if not parts:
+                continue
+
+            if remaining:
+                pins.append(parts[0])
+                remaining -= 1
+                if not remaining:
+                    builder.add_net(net_name, pins)
+                    pins.clear()
+            elif parts[0] == 'NetDegree':
+                # Format: NetDegree : <degree> [<net name>]
+                remaining = int(parts[2])
+                net_name = parts[3] if len(parts) > 3 else f"C_{num_nets}"
+                num_nets += 1
+
+    return num_nets
+
+
+def parse_bookshelf(base_path):
+    """
+    Parses the Bookshelf files of one design (<base_path>.blocks, .nets and optionally .power)
+    into a Netlist. Terminals only appear as pins of the nets.
+    """
+    blocks, _ = parse_blocks_file(base_path + ".blocks")
+
+    power_map = {}
+    if os.path.exists(base_path + ".power"):
+        power_map = parse_power_file(base_path + ".power", blocks)
+
+    builder = NetlistBuilder()
+    for name, width, height in blocks:
+        builder.add_block(name, width, height, power_map.get(name))
+
+    if os.path.exists(base_path + ".nets"):
+        read_nets(base_path + ".nets", builder)
+
+    return builder.build()
+
+
+def find_jobs(input_folder, output_folder):
+    """
+    Returns the (input_paths, output_path) pairs to extract from a folder of Bookshelf files.
+    The .blocks file of a design comes first, followed by its .nets and .power files if present.
+    """
+    jobs = []
+    for filename in sorted(os.listdir(input_folder)):
+        if filename.endswith(".blocks"):
+            base_name = filename[:-7]  # Remove ".blocks" from the end of the filename
+            base_path = os.path.join(input_folder, base_name)
+            input_paths = [base_path + extension for extension in (".blocks", ".nets", ".power")
+                           if os.path.exists(base_path + extension)]
+            # The "_bookshelf" suffix keeps these apart from the YAL outputs of the same designs
+            output_path = os.path.join(output_folder, f"Corblivar_{base_name}_bookshelf_parsed.txt")
+            jobs.append((input_paths, output_path))
+    return jobs
+
+
+def extract(input_paths, output_path):
+    """
+    Converts the Bookshelf files of one design into the refined Blocks/Connections format.
+    Returns the Netlist.
+    """
+    netlist = parse_bookshelf(input_paths[0][:-7])
+    netlist.write_refined(output_path)
+    return netlist
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python extract_Bookshelf_netlists.py <input_folder> <output_folder>")
+        sys.exit(1)
+
+    input_folder = sys.argv[1]
+    output_folder = sys.argv[2]
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    for input_paths, output_path in find_jobs(input_folder, output_folder):
+        netlist = extract(input_paths, output_path)
+        print(f"Processed {os.path.basename(input_paths[0])} ({netlist.num_blocks} blocks, "
+              f"{netlist.num_nets} nets) -> {output_path}")
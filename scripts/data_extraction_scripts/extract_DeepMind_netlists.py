@@ -1,12 +1,180 @@
 import sys
 import os
 import re
+import tempfile
+from collections import namedtuple
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import instrumentation
+from netlist import NetlistBuilder
+
+# Quoted strings, braces, and any other run of non-space characters
+_token_pattern = re.compile(r'"(?:[^"\\]|\\.)*"|[{}]|[^\s{}"]+')
+
+# Counts reported by the streaming extraction in place of a full Netlist
+ExtractionSummary = namedtuple('ExtractionSummary', ['num_blocks', 'num_nets', 'num_pins'])
+
+
+def _unquote(value):
+    if value.startswith('"'):
+        return value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return value
+
+def _split_fields(line):
+    """
+    Splits a line holding several fields, such as 'attr { key: "x" value { f: 1 } }',
+    into one field or brace per line.
+    """
+    lines = []
+    pending = None
+    for token in _token_pattern.findall(line):
+        if token == '{':
+            lines.append(f"{pending or ''} {{")
+            pending = None
+        elif token == '}':
+            lines.append('}')
+        elif pending is None:
+            pending = token
+        else:
+            lines.append(f"{pending} {token}")
+            pending = None
+    return lines
+
+def iter_nodes(file):
+    """
+    Streams the nodes of a Circuit Training netlist.pb.txt file.
+    A brace-depth state machine walks the file line by line, so only the current node is held in memory.
+    Yields (name, inputs, attrs) with attrs mapping each attr key to its value.
+    """
+    depth = 0
+    in_node = in_attr = False
+    name = attr_key = None
+    inputs = attrs = None
+
+    for line in file:
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+
+        # Pretty-printed files hold one field or brace per line; anything else is split up first
+        if line == '}' or ('}' not in line and ('{' not in line or (line[-1] == '{' and line.count('{') == 1
+                                                                        and '"' not in line))):
+            fields = (line,)
+        else:
+            fields = _split_fields(line)
+
+        for field in fields:
+            if field == '}':
+                depth -= 1
+                if depth == 0 and in_node:
+                    yield name, inputs, attrs
+                    in_node = False
+                elif depth == 1:
+                    in_attr = False
+            elif field[-1] == '{':
+                depth += 1
+                key = field[:-1].strip().rstrip(':').rstrip()
+                if depth == 1:
+                    in_node = key == 'node'
+                    name, inputs, attrs = None, [], {}
+                elif depth == 2:
+                    in_attr = in_node and key == 'attr'
+                    attr_key = None
+            else:
+                key, _, value = field.partition(':')
+                value = _unquote(value.strip())
+                if depth == 1 and in_node:
+                    if key == 'name':
+                        name = value
+                    elif key == 'input':
+                        inputs.append(value)
+                elif depth == 2 and in_attr and key == 'key':
+                    attr_key = value
+                elif depth == 3 and in_attr and attr_key is not None:
+                    attrs[attr_key] = value
+
+def _is_block(attrs):
+    return 'width' in attrs and 'height' in attrs
+
+def _is_macro_pin(attrs):
+    return attrs.get('type') == 'macro_pin' and 'macro_name' in attrs
+
+def parse_deepmind(input_file):
+    """
+    Parses a Circuit Training netlist into a Netlist.
+    Nodes with a width and height become blocks, and every node with inputs drives a net
+    connecting it to its inputs. Macro pins are replaced by their macro.
+    """
+    builder = NetlistBuilder()
+    nets = []
+    macro_of_pin = {}
+    with open(input_file, 'r') as f:
+        for name, inputs, attrs in iter_nodes(f):
+            if _is_block(attrs):
+                builder.add_block(name, float(attrs['width']), float(attrs['height']))
+            if _is_macro_pin(attrs):
+                macro_of_pin[name] = attrs['macro_name']
+            if inputs:
+                nets.append((name, [name] + inputs))
+
+    for net_name, pins in nets:
+        builder.add_net(net_name, [macro_of_pin.get(pin, pin) for pin in pins])
+    return builder.build()
+
+def find_jobs(input_dir, output_dir):
+    """
+    Returns the (input_paths, output_path) pairs to extract from a DeepMind folder:
+    DeepMind_data.txt and any other Circuit Training *.pb.txt netlists.
+    """
+    jobs = []
+    for file_name in sorted(os.listdir(input_dir)):
+        input_file = os.path.join(input_dir, file_name)
+        if file_name == "DeepMind_data.txt":
+            jobs.append(([input_file], os.path.join(output_dir, "DeepMind_parsed.txt")))
+        elif file_name.endswith(".pb.txt"):
+            stem = file_name[:-7]  # Remove ".pb.txt" from the end of the filename
+            jobs.append(([input_file], os.path.join(output_dir, f"DeepMind_{stem}_parsed.txt")))
+
+    if not jobs:
+        print(f"Error: Neither 'DeepMind_data.txt' nor any .pb.txt file was found in the directory {input_dir}")
+    return jobs
+
+def extract(input_paths, output_file):
+    """
+    Streams a Circuit Training netlist into the refined format.
+    Blocks are written as they are parsed while nets are spooled to a temporary file,
+    so memory stays constant apart from the macro pin to macro mapping.
+    Returns an ExtractionSummary.
+    """
+    num_blocks = num_nets = num_pins = 0
+    macro_of_pin = {}
+
+    with open(input_paths[0], 'r') as f, open(output_file, 'w') as out, \
+            tempfile.TemporaryFile('w+', dir=os.path.dirname(os.path.abspath(output_file))) as spool:
+        out.write("Blocks:\n")
+        for name, inputs, attrs in iter_nodes(f):
+            if _is_block(attrs):
+                out.write(f"{name}, {float(attrs['width']):g}, {float(attrs['height']):g}, None\n")
+                num_blocks += 1
+            if _is_macro_pin(attrs):
+                macro_of_pin[name] = attrs['macro_name']
+            if inputs:
+                spool.write(f"{name} {name} {' '.join(inputs)}\n")
+                num_nets += 1
+                num_pins += len(inputs) + 1
+
+        out.write("\nConnections:\n")
+        spool.seek(0)
+        for line in spool:
+            net_name, *pins = line.split()
+            out.write(f"{net_name} {' '.join(macro_of_pin.get(pin, pin) for pin in pins)};\n")
+
+    instrumentation.count_files([output_file], 'written')
+    return ExtractionSummary(num_blocks, num_nets, num_pins)
 
 def parse_netlist(input_dir, output_dir):
-    # Locate input file in the directory
-    input_file = os.path.join(input_dir, "DeepMind_data.txt")
-    if not os.path.isfile(input_file):
-        print(f"Error: The file 'DeepMind_data.txt' was not found in the directory {input_dir}")
+    jobs = find_jobs(input_dir, output_dir)
+    if not jobs:
         sys.exit(1)
 
     # Ensure output directory exists
@@ -14,36 +182,9 @@ def parse_netlist(input_dir, output_dir):
         print(f"Error: The output directory {output_dir} does not exist.")
         sys.exit(1)
 
-    # Define output file path
-    output_file = os.path.join(output_dir, "DeepMind_parsed.txt")
-
-    with open(input_file, 'r') as f:
-        content = f.read()
-    
-    # Regex to find nodes with width and height
-    block_pattern = re.compile(
-        r'node\s*{\s*name:\s*"(?P<name>.*?)".*?'
-        r'attr\s*{\s*key:\s*"width".*?f:\s*(?P<width>[\d.]+).*?'
-        r'attr\s*{\s*key:\s*"height".*?f:\s*(?P<height>[\d.]+).*?}', 
-        re.DOTALL
-    )
-
-    blocks = []
-
-    # Extract blocks
-    for match in block_pattern.finditer(content):
-        name = match.group("name")
-        width = match.group("width")
-        height = match.group("height")
-        blocks.append(f"{name}, {width}, {height}, None")
-
-    # Write to output file
-    with open(output_file, 'w') as f:
-        f.write("Blocks:\n")
-        f.write("\n".join(blocks))
-        f.write("\n\nConnections:\n")  # Connections remain empty
-
-    print(f"Output written to {output_file}")
+    for input_paths, output_file in jobs:
+        extract(input_paths, output_file)
+        print(f"Output written to {output_file}")
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
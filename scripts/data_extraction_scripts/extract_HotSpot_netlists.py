@@ -1,8 +1,23 @@
+import itertools
 import os
 import sys
 
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import instrumentation
+from netlist import NetlistBuilder
+from shape_curves import squarest_shapes
+
+@instrumentation.timed('parse_desc')
 def parse_desc_file(desc_file_path):
-    blocks = []
+    """
+    Reads the blocks and connections of a HotSpot floorplan description. Its blocks are soft:
+    <unit-name> <area-in-m2> <min-aspect-ratio> <max-aspect-ratio> <rotable>, and each is given
+    the shape closest to a square within its limits, resolved for all blocks at once.
+    """
+    names = []
+    limits = []  # (area, min_aspect, max_aspect, rotatable) of every block
     connections = []
     with open(desc_file_path, 'r') as file:
         for line in file:
@@ -12,20 +27,69 @@ def parse_desc_file(desc_file_path):
             parts = line.split()
             # Parsing blocks
             if len(parts) == 5:
-                block_name = parts[0]
+                names.append(parts[0])
                 area = float(parts[1]) * 1e12  # Convert m^2 to micrometers^2
-                min_aspect = float(parts[2])
-                max_aspect = float(parts[3])
-                width = round((area / min_aspect) ** 0.5)  # Round to nearest integer
-                height = round(area / width)  # Round to nearest integer
-                blocks.append((block_name, width, height))
+                limits.append((area, float(parts[2]), float(parts[3]), parts[4] == "1"))
             # Parsing connections
             elif len(parts) == 3:
                 unit1 = parts[0]
                 unit2 = parts[1]
                 connections.append((unit1, unit2))
+
+    blocks = []
+    if limits:
+        area, min_aspect, max_aspect, rotatable = np.array(limits).T
+        width, _ = squarest_shapes(area, min_aspect, max_aspect, rotatable)
+        width = np.round(width)  # Round to nearest integer
+        height = np.round(area / width)
+        blocks = list(zip(names, width.astype(np.int64).tolist(), height.astype(np.int64).tolist()))
     return blocks, connections
 
+@instrumentation.timed('parse_flp')
+def parse_flp_file(flp_file_path):
+    """
+    Reads the blocks of a HotSpot floorplan: <unit-name> <width> <height> <left-x> <bottom-y> in meters,
+    optionally followed by thermal properties. Floorplans carry no connectivity.
+    """
+    blocks = []
+    with open(flp_file_path, 'r') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) < 5 or parts[0].startswith("#"):
+                continue
+            width = round(float(parts[1]) * 1e6)  # Convert m to micrometers
+            height = round(float(parts[2]) * 1e6)
+            blocks.append((parts[0], width, height))
+    return blocks, []
+
+@instrumentation.timed('parse_ptrace')
+def parse_ptrace_file(ptrace_file_path, chunk_rows=4096):
+    """
+    Reduces a HotSpot power trace, a header of unit names followed by one row of power values per time step,
+    to the average and peak power of every unit. Rows are parsed chunk_rows at a time,
+    so memory stays constant however long the trace is.
+    Returns the unit names, their average and peak power, and the number of time steps.
+    """
+    with open(ptrace_file_path, 'r') as file:
+        names = file.readline().split()
+        total = np.zeros(len(names))
+        peak = np.full(len(names), -np.inf)
+        num_rows = 0
+        while True:
+            lines = list(itertools.islice(file, chunk_rows))
+            if not lines:
+                break
+            rows = np.loadtxt(lines, ndmin=2).reshape(-1, len(names))
+            # A chunk of blank lines only, such as the trailing newline after a multiple of chunk_rows rows
+            if not len(rows):
+                continue
+            total += rows.sum(axis=0)
+            np.maximum(peak, rows.max(axis=0), out=peak)
+            num_rows += len(rows)
+    average = total / num_rows if num_rows else total
+    return names, average, np.where(num_rows, peak, 0)
+
+@instrumentation.timed('parse_power')
 def parse_power_file(power_file_path):
     power_map = {}
     with open(power_file_path, 'r') as file:
@@ -37,45 +101,110 @@ def parse_power_file(power_file_path):
                 power_map[block_name] = power
     return power_map
 
+@instrumentation.timed('build')
+def build_netlist(blocks, connections, power_map):
+    builder = NetlistBuilder()
+    for block_name, width, height in blocks:
+        # Default to 0 if not in power_map, unknown without power file
+        power = power_map.get(block_name, 0) if power_map is not None else None
+        builder.add_block(block_name, width, height, power)
+
+    for i, connection in enumerate(connections):
+        builder.add_net(f"c_{i}", connection)
+    return builder.build()
+
 def generate_output_file(output_path, blocks, connections, power_map):
-    with open(output_path, 'w') as file:
-        # Write Blocks section
-        file.write("Blocks:\n")
-        for block in blocks:
-            block_name, width, height = block
-            power = power_map.get(block_name, 0)  # Default to 0 if not in power_map
-            file.write(f"{block_name}, {width}, {height}, {power}\n")
-
-        # Write Connections section
-        file.write("\nConnections:\n")
-        for i, connection in enumerate(connections):
-            file.write(f"c_{i} {connection[0]} {connection[1]}\n")
+    netlist = build_netlist(blocks, connections, power_map)
+    netlist.write_refined(output_path)
+    return netlist
+
+# Power of a block taken from a power trace: its average or its peak over the time steps
+power_statistic = "average"
+
+GEOMETRY_EXTENSIONS = (".desc", ".flp")
+POWER_EXTENSIONS = (".ptrace", ".p")
+
+def find_jobs(input_dir, output_dir):
+    """
+    Returns the (input_paths, output_path) pairs to extract from a HotSpot folder: one per floorplan
+    (.desc or .flp) and power file (.ptrace or .p) pair. A power file goes with the floorplan of the same name,
+    or with the only floorplan of the folder; a floorplan without power file is extracted with unknown power.
+    A folder holding a single pair keeps the HotSpot_parsed.txt output name.
+    """
+    files = sorted(os.listdir(input_dir))
+    geometries = [name for name in files if name.endswith(GEOMETRY_EXTENSIONS)]
+    powers = [name for name in files if name.endswith(POWER_EXTENSIONS)]
+    if not geometries:
+        print(f"Error: no .desc or .flp file in {input_dir}.")
+        return []
+
+    def stem(name):
+        return os.path.splitext(name)[0]
+
+    geometry_stems = {stem(name) for name in geometries}
+    pairs = []
+    for geometry in geometries:
+        matched = [power for power in powers if stem(power) == stem(geometry)
+                   or (len(geometries) == 1 and stem(power) not in geometry_stems)]
+        pairs.extend((geometry, power) for power in matched)
+        if not matched:
+            pairs.append((geometry, None))
+    for power in powers:
+        if len(geometries) > 1 and stem(power) not in geometry_stems:
+            print(f"Skipping {power}: no floorplan of the same name.")
+
+    jobs = []
+    for geometry, power in pairs:
+        if len(pairs) == 1:
+            output_name = "HotSpot_parsed.txt"
+        elif power is None or stem(power) == stem(geometry):
+            output_name = f"HotSpot_{stem(geometry)}_parsed.txt"
+        else:
+            output_name = f"HotSpot_{stem(geometry)}_{stem(power)}_parsed.txt"
+        input_paths = [os.path.join(input_dir, name) for name in (geometry, power) if name is not None]
+        jobs.append((input_paths, os.path.join(output_dir, output_name)))
+    return jobs
+
+def extract(input_paths, output_path):
+    """
+    Writes the blocks and connections of a floorplan description or floorplan with the power of each block,
+    from a power file or the average (or peak, see power_statistic) of a power trace. Returns the Netlist.
+    """
+    geometry_file = input_paths[0]
+    if geometry_file.endswith(".flp"):
+        blocks, connections = parse_flp_file(geometry_file)
+    else:
+        blocks, connections = parse_desc_file(geometry_file)
+
+    if len(input_paths) == 1:
+        power_map = None
+    elif input_paths[1].endswith(".ptrace"):
+        names, average, peak = parse_ptrace_file(input_paths[1])
+        power_map = dict(zip(names, (peak if power_statistic == "peak" else average).tolist()))
+    else:
+        power_map = parse_power_file(input_paths[1])
+    return generate_output_file(output_path, blocks, connections, power_map)
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <input_directory> <output_directory>")
+    global power_statistic
+    if len(sys.argv) not in (3, 4) or sys.argv[3:] not in ([], ["average"], ["peak"]):
+        print("Usage: python script.py <input_directory> <output_directory> [average|peak]")
         return
     
     input_dir = sys.argv[1]
     output_dir = sys.argv[2]
-    desc_file = os.path.join(input_dir, "ev6.desc")
-    power_file = os.path.join(input_dir, "avg.p")
-    output_file = os.path.join(output_dir, "HotSpot_parsed.txt")
-
-    if not os.path.exists(desc_file):
-        print(f"Error: {desc_file} does not exist.")
-        return
+    if len(sys.argv) == 4:
+        power_statistic = sys.argv[3]
 
-    if not os.path.exists(power_file):
-        print(f"Error: {power_file} does not exist.")
+    jobs = find_jobs(input_dir, output_dir)
+    if not jobs:
         return
 
     os.makedirs(output_dir, exist_ok=True)
 
-    blocks, connections = parse_desc_file(desc_file)
-    power_map = parse_power_file(power_file)
-    generate_output_file(output_file, blocks, connections, power_map)
-    print(f"Output written to {output_file}")
+    for input_paths, output_file in jobs:
+        extract(input_paths, output_file)
+        print(f"Output written to {output_file}")
 
 if __name__ == "__main__":
     main()
@@ -1,39 +1,62 @@
 import os
 import sys
 
-def process_file(input_path, output_path):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import instrumentation
+from netlist import NetlistBuilder
+
+
+def find_jobs(input_dir, output_dir):
     """
-    Process a single input file and write the formatted data to the output file.
+    Returns the (input_paths, output_path) pairs to extract from a UM folder.
     """
-    # Check input file extension
-    if not input_path.endswith(".txt") or input_path.endswith(".bbb.txt"):
-        print(f"Skipping file: {input_path}")
-        return
+    jobs = []
+    for file_name in sorted(os.listdir(input_dir)):
+        input_path = os.path.join(input_dir, file_name)
+        # Check input file extension
+        if not input_path.endswith(".txt") or input_path.endswith(".bbb.txt"):
+            print(f"Skipping file: {input_path}")
+            continue
+        output_path = os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}_parsed.txt")
+        jobs.append(([input_path], output_path))
+    return jobs
 
-    try:
-        with open(input_path, "r") as infile:
+
+def extract(input_paths, output_path):
+    """
+    Process a single input file and write the formatted data to the output file.
+    Returns the Netlist.
+    """
+    with instrumentation.span('parse'):
+        with open(input_paths[0], "r") as infile:
             lines = infile.readlines()
-        
+
         # Read the number of blocks (first line) and ignore it
         num_blocks = lines[0].strip()
 
         # Process the block details
-        blocks = []
+        builder = NetlistBuilder()
         for i, line in enumerate(lines[1:], start=1):
             parts = line.strip().split()
             if len(parts) == 2:  # Ensure it's a valid line with two numbers
                 x, y = parts
-                blocks.append(f"block{i}, {x}, {y}, None")
-        
-        # Write to the output file
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "w") as outfile:
-            outfile.write("Blocks:\n")
-            outfile.write("\n".join(blocks))
-        
+                builder.add_block(f"block{i}", float(x), float(y))
+
+    # Write to the output file
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    netlist = builder.build()
+    netlist.write_refined(output_path, dimension_format='.2f')
+    return netlist
+
+
+def process_file(input_path, output_path):
+    """
+    Process a single input file and report the outcome.
+    """
+    try:
+        extract([input_path], output_path)
         print(f"Processed file: {input_path}")
         print(f"Output written to {output_path}")
-    
     except Exception as e:
         print(f"Error processing file: {input_path}, Error: {e}")
 
@@ -55,7 +78,5 @@ if __name__ == "__main__":
             print(f"Invalid input directory: {input_dir}")
         else:
             # Process each file in the input directory
-            for file_name in os.listdir(input_dir):
-                input_path = os.path.join(input_dir, file_name)
-                output_path = os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}_parsed.txt")
-                process_file(input_path, output_path)
+            for input_paths, output_path in find_jobs(input_dir, output_dir):
+                process_file(input_paths[0], output_path)
@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import instrumentation
+
+# Soft block shapes shared by the extractors of soft block formats
+_SHAPE_CURVES = os.path.join(os.pardir, 'shape_curves.py')
+
+# Extractor module, raw data subfolder, refined output subfolder and shared parser sources of every source format
+EXTRACTORS = {
+    'SMU': ('extract_SMU_netlists', 'SMU', 'SMU_netlists', ('yal_parser.py',)),
+    'UM': ('extract_UM_netlists', 'UM', 'UM_netlists', ()),
+    'Corblivar': ('extract_Corblivar_netlists', 'Corblivar', 'Corblivar_netlists', ('yal_parser.py',)),
+    'Bookshelf': ('extract_Bookshelf_netlists', 'Corblivar', 'Corblivar_netlists', (_SHAPE_CURVES,)),
+    'HotSpot': ('extract_HotSpot_netlists', 'HotSpot', 'HotSpot_netlists', (_SHAPE_CURVES,)),
+    'DeepMind': ('extract_DeepMind_netlists', 'DeepMind', 'DeepMind_netlists', ()),
+}
+
+# Sources every extractor depends on, relative to this folder
+COMMON_SOURCES = (os.path.join(os.pardir, 'netlist.py'), os.path.join(os.pardir, 'instrumentation.py'))
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def hash_file(path):
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parser_version(format_name):
+    """
+    Returns a stamp of the code that produces a format's refined files:
+    a hash over the extractor and every parser source it shares.
+    """
+    module_name, _, _, shared_sources = EXTRACTORS[format_name]
+    digest = hashlib.sha256()
+    for source in (module_name + '.py',) + tuple(shared_sources) + COMMON_SOURCES:
+        digest.update(hash_file(os.path.join(_script_dir, source)).encode())
+    return digest.hexdigest()
+
+
+def file_state(path, previous=None):
+    """
+    Returns the size, mtime and content hash of a file.
+    The hash of a previous state is reused when the size and mtime did not change.
+    """
+    stat = os.stat(path)
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        return previous
+    return {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': hash_file(path)}
+
+
+def is_fresh(previous, version, input_states, output_path):
+    """Tells whether a manifest entry still describes the output the job would produce."""
+    if not previous or previous.get('status') != 'ok' or previous.get('parser_version') != version:
+        return False
+    if [state['sha256'] for state in input_states] != [state['sha256'] for state in previous['inputs']]:
+        return False
+    try:
+        stat = os.stat(output_path)
+    except FileNotFoundError:
+        return False
+    output = previous['output_state']
+    return output['size'] == stat.st_size and output['mtime_ns'] == stat.st_mtime_ns
+
+
+def discover_jobs(raw_dir, output_dir, formats):
+    """
+    Returns a (format, input_paths, output_path) tuple for every file the extractors would process.
+    """
+    jobs = []
+    for format_name in formats:
+        module_name, raw_subdir, output_subdir, _ = EXTRACTORS[format_name]
+        input_dir = os.path.join(raw_dir, raw_subdir)
+        if not os.path.isdir(input_dir):
+            print(f"Skipping {format_name}: {input_dir} does not exist")
+            continue
+        module = importlib.import_module(module_name)
+        for input_paths, output_path in module.find_jobs(input_dir, os.path.join(output_dir, output_subdir)):
+            jobs.append((format_name, [os.path.abspath(path) for path in input_paths],
+                         os.path.abspath(output_path)))
+    return jobs
+
+
+def run_job(format_name, input_paths, output_path):
+    """
+    Runs one extraction and returns its manifest entry. Errors are recorded instead of raised.
+    """
+    entry = {'format': format_name, 'inputs': input_paths, 'output': output_path}
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(EXTRACTORS[format_name][0])
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with instrumentation.span(f'extract_{format_name}'):
+            netlist = module.extract(input_paths, output_path)
+            instrumentation.count_files(input_paths, 'read')
+            instrumentation.count_netlist(netlist)
+        stat = os.stat(output_path)
+        entry.update(status='ok', blocks=netlist.num_blocks, nets=netlist.num_nets, pins=netlist.num_pins,
+                     output_state={'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    except Exception as e:
+        entry.update(status='error', error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    entry['seconds'] = round(time.perf_counter() - start, 6)
+    return entry
+
+
+def load_manifest(manifest_path):
+    """Returns the manifest entries of a previous run keyed by output path."""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as f:
+        entries = json.load(f)['files']
+    # Entries without a parser version cannot be checked for staleness
+    return {entry['output']: entry for entry in entries if 'parser_version' in entry}
+
+
+def extract_all(raw_dir, output_dir, formats=tuple(EXTRACTORS), workers=None, previous=None):
+    """
+    Extracts every raw netlist of the given formats over a process pool.
+    With the entries of a previous manifest, outputs whose raw inputs and parser are unchanged
+    are skipped, and outputs that no input produces any more are deleted.
+    Returns the manifest entries.
+    """
+    previous = previous or {}
+    versions = {format_name: parser_version(format_name) for format_name in formats}
+
+    entries = []
+    stale_jobs = []
+    for format_name, input_paths, output_path in discover_jobs(raw_dir, output_dir, formats):
+        old_entry = previous.get(output_path)
+        old_inputs = {state['path']: state for state in old_entry['inputs']} if old_entry else {}
+        input_states = [file_state(path, old_inputs.get(path)) for path in input_paths]
+        if is_fresh(old_entry, versions[format_name], input_states, output_path):
+            entries.append(dict(old_entry, inputs=input_states))
+        else:
+            stale_jobs.append((format_name, input_paths, output_path, input_states))
+
+    # Outputs of earlier runs that no current input produces
+    produced = {entry['output'] for entry in entries} | {job[2] for job in stale_jobs}
+    for output_path, old_entry in previous.items():
+        if output_path in produced:
+            continue
+        if old_entry['format'] not in formats:
+            entries.append(old_entry)
+        elif os.path.exists(output_path):
+            os.remove(output_path)
+            print(f"Removed orphaned {output_path}")
+
+    def record(job, entry):
+        entry.update(inputs=job[3], parser_version=versions[job[0]])
+        entries.append(entry)
+        if entry['status'] == 'ok':
+            print(f"Processed {os.path.basename(job[1][0])} -> {entry['output']}")
+        else:
+            print(f"Error processing {job[1][0]}: {entry['error']}")
+
+    if workers == 1 or len(stale_jobs) <= 1:
+        for job in stale_jobs:
+            record(job, run_job(*job[:3]))
+    else:
+        worker_settings = instrumentation.settings()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(instrumentation.call, worker_settings, run_job, *job[:3]): job
+                       for job in stale_jobs}
+            for future in as_completed(futures):
+                entry, state = future.result()
+                instrumentation.absorb(state)
+                record(futures[future], entry)
+
+    return sorted(entries, key=lambda entry: entry['output'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the netlists of all source formats in parallel.")
+    parser.add_argument("raw_dir", type=str, help="Raw data directory with one subfolder per source (SMU, UM, ...).")
+    parser.add_argument("output_dir", type=str, help="Directory that receives one <source>_netlists folder per source.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: all cores).")
+    parser.add_argument("--formats", nargs="+", choices=list(EXTRACTORS), default=list(EXTRACTORS),
+                        help="Source formats to extract (default: all).")
+    parser.add_argument("--manifest", type=str, default=None,
+                        help="Path of the JSON manifest (default: <output_dir>_extraction_manifest.json next to the "
+                             "output directory, so that it never mixes with the refined netlists).")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-extract every file, even if its raw input and parser are unchanged.")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.report:
+        instrumentation.enable(args.trace_memory)
+
+    manifest_path = args.manifest or os.path.normpath(args.output_dir) + "_extraction_manifest.json"
+
+    start = time.perf_counter()
+    previous = {} if args.force else load_manifest(manifest_path)
+    entries = extract_all(args.raw_dir, args.output_dir, args.formats, args.workers, previous)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump({'seconds': round(elapsed, 6), 'files': entries}, f, indent=2)
+
+    if args.report:
+        instrumentation.write_report(args.report, script='extract_all_netlists')
+    failed = sum(entry['status'] != 'ok' for entry in entries)
+    print(f"{len(entries) - failed} of {len(entries)} files up to date after {elapsed:.2f}s, {failed} errors. "
+          f"Manifest written to {manifest_path}")
+    # A nonzero status tells callers such as run_pipeline.py that the outputs are incomplete
+    sys.exit(1 if failed else 0)
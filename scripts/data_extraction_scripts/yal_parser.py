@@ -0,0 +1,129 @@
+import os
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import instrumentation
+from netlist import NetlistBuilder
+
+# Names of the power pins whose CURRENT and VOLTAGE make up a block's power
+_power_pin_pattern = re.compile(r'P_\d+$')
+_number_pattern = re.compile(r'[\d.]+$')
+
+
+def iter_statements(content):
+    """
+    Walks YAL content once and yields (start, end, text) for every ';'-terminated statement.
+    start and end are offsets into content, end pointing just past the ';'.
+    Comments are dropped from the statement text.
+    """
+    pos = 0
+    length = len(content)
+    while pos < length:
+        start = pos
+        pieces = []
+        while True:
+            semicolon = content.find(';', pos)
+            stop = length if semicolon == -1 else semicolon
+            comment = content.find('/*', pos, stop)
+            if comment == -1:
+                break
+            pieces.append(content[pos:comment])
+            comment_end = content.find('*/', comment + 2)
+            pos = length if comment_end == -1 else comment_end + 2
+
+        if semicolon == -1:
+            return
+        pieces.append(content[pos:semicolon])
+        pos = semicolon + 1
+        yield start, pos, ' '.join(pieces)
+
+
+def _module_power(tokens):
+    """Returns CURRENT * VOLTAGE for a PWR pin statement, or None for any other statement."""
+    if len(tokens) < 2 or tokens[1] != 'PWR' or not _power_pin_pattern.search(tokens[0]):
+        return None
+    for i, token in enumerate(tokens[2:-3], start=2):
+        if (token == 'CURRENT' and tokens[i + 2] == 'VOLTAGE'
+                and _number_pattern.match(tokens[i + 1]) and _number_pattern.match(tokens[i + 3])):
+            return float(tokens[i + 1]) * float(tokens[i + 3])
+    return None
+
+
+def parse_yal_content(content):
+    """
+    Parses YAL content in a single pass and extracts blocks and connections.
+    Returns the blocks as a list of dicts and the raw text of all NETWORK sections.
+    """
+    blocks = []
+    network_sections = []
+
+    module = None
+    power = []
+    network_start = None
+
+    for start, end, text in iter_statements(content):
+        tokens = text.split()
+        if not tokens:
+            continue
+        keyword = tokens[0]
+
+        if keyword == 'MODULE' and len(tokens) == 2:
+            module = {'name': tokens[1], 'width': None, 'height': None, 'power': None}
+            power = []
+            network_start = None
+        elif module is None:
+            continue
+        elif keyword == 'ENDMODULE':
+            module['power'] = sum(power) if power else None
+            blocks.append(module)
+            module = None
+        elif keyword == 'DIMENSIONS':
+            # Only the first DIMENSIONS statement of a module counts
+            if module['width'] is None and len(tokens) >= 7 and all(t.isdigit() for t in tokens[1:7]):
+                x1, y1, x2, y2, x3, y3 = map(int, tokens[1:7])
+                module['width'] = abs(x3 - x1)
+                module['height'] = abs(y3 - y1)
+        elif keyword == 'NETWORK':
+            network_start = end
+        elif keyword == 'ENDNETWORK':
+            if network_start is not None:
+                network_sections.append(content[network_start:start].strip())
+                network_start = None
+        else:
+            pin_power = _module_power(tokens)
+            if pin_power is not None:
+                power.append(pin_power)
+
+    return blocks, '\n'.join(network_sections).strip()
+
+
+def parse_yal_file(file_path):
+    """
+    Parses a .yal file and extracts blocks and connections.
+    """
+    with instrumentation.span('read'), open(file_path, 'r') as file:
+        content = file.read()
+    with instrumentation.span('parse_yal'):
+        return parse_yal_content(content)
+
+
+@instrumentation.timed('build')
+def build_netlist(blocks, connections_section):
+    """
+    Builds a Netlist from parsed YAL blocks and the raw network section.
+    Every network statement becomes a net named after its instance.
+    """
+    builder = NetlistBuilder()
+    for block in blocks:
+        # Skip blocks without dimensions (bound blocks)
+        if block['width'] is None or block['height'] is None:
+            continue
+        builder.add_block(block['name'], block['width'], block['height'], block['power'] or None)
+
+    for statement in connections_section.split(';'):
+        tokens = statement.split()
+        if tokens:
+            builder.add_net(tokens[0], tokens[1:])
+
+    return builder.build()
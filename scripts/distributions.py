@@ -0,0 +1,136 @@
+import json
+import os
+
+import numpy as np
+
+# Number of quantiles in the inverse-CDF tables
+QUANTILE_POINTS = 257
+
+# Where the statistics of the refined data, and so the default distribution artifact, are saved
+DEFAULT_DISTRIBUTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                     "statistics of refined data", "distributions.json")
+
+
+def alias_table(weights):
+    """
+    Builds Vose's alias table of a discrete distribution: drawing a slot uniformly,
+    then keeping it with probability prob[slot] or taking alias[slot] otherwise,
+    samples index i with probability weights[i] / sum(weights).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    scaled = weights * len(weights) / weights.sum()
+    prob = np.ones(len(weights))
+    alias = np.arange(len(weights))
+    small = [i for i, w in enumerate(scaled) if w < 1]
+    large = [i for i, w in enumerate(scaled) if w >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+    return prob, alias
+
+
+def sample_alias(rng, prob, alias, size):
+    """Draws size indices from an alias table in O(1) each."""
+    slots = rng.integers(0, len(prob), size)
+    return np.where(rng.random(size) < prob[slots], slots, alias[slots])
+
+
+def sample_inverse_cdf(rng, table, size):
+    """Draws size values from a table of evenly spaced quantiles, interpolating linearly between them."""
+    position = rng.random(size) * (len(table) - 1)
+    lower = np.minimum(position.astype(np.int64), len(table) - 2)
+    return table[lower] + (table[lower + 1] - table[lower]) * (position - lower)
+
+
+def build_distributions(summaries):
+    """
+    Builds the distribution artifact the augmentation samples from, out of the statistics summaries:
+    inverse-CDF tables of the width and power, the aspect ratio conditioned on the width
+    as alias tables over the rows of the joint width/aspect histogram, and an alias table of the net degree.
+    """
+    grid = np.linspace(0, 1, QUANTILE_POINTS)
+    joint = summaries["Width x Aspect Ratio"]
+    connectivity = summaries["Connectivity"]
+
+    # Width bins of the joint histogram, with one alias table over its aspect ratio bins per non-empty row
+    aspect_rows = {}
+    for row in np.flatnonzero(joint.counts.sum(axis=1)).tolist():
+        bins = np.flatnonzero(joint.counts[row])
+        prob, alias = alias_table(joint.counts[row, bins])
+        aspect_rows[str(row)] = {"bins": bins.tolist(), "prob": prob.tolist(), "alias": alias.tolist()}
+
+    degrees = np.flatnonzero(connectivity.degree_counts)
+    prob, alias = alias_table(connectivity.degree_counts[degrees])
+
+    return {
+        "width": {"quantiles": summaries["Width"].quantile(grid).tolist()},
+        "power": {"quantiles": summaries["Power"].quantile(grid).tolist()},
+        "aspect_ratio": {
+            "min": float(summaries["Aspect Ratio"].sketch.min),
+            "max": float(summaries["Aspect Ratio"].sketch.max),
+            "width_edges": joint.x_edges.tolist(),
+            "aspect_edges": joint.y_edges.tolist(),
+            "rows": aspect_rows,
+        },
+        "net_degree": {"degrees": degrees.tolist(), "prob": prob.tolist(), "alias": alias.tolist()},
+        "nets_per_block": connectivity.num_nets / connectivity.num_blocks if connectivity.num_blocks else 0.0,
+    }
+
+
+class BlockSampler:
+    """Samples blocks and net degrees from a distribution artifact, in O(1) per draw."""
+
+    def __init__(self, distributions):
+        self.width_table = np.array(distributions["width"]["quantiles"])
+        self.power_table = np.array(distributions["power"]["quantiles"])
+        aspect = distributions["aspect_ratio"]
+        self.aspect_range = (aspect["min"], aspect["max"])
+        self.width_edges = np.array(aspect["width_edges"])
+        self.aspect_edges = np.concatenate(([aspect["min"]], aspect["aspect_edges"], [aspect["max"]]))
+        self.aspect_rows = {int(row): (np.array(table["bins"]), np.array(table["prob"]), np.array(table["alias"]))
+                            for row, table in aspect["rows"].items()}
+        degree = distributions["net_degree"]
+        self.degrees = np.array(degree["degrees"], dtype=np.int64)
+        self.degree_prob = np.array(degree["prob"])
+        self.degree_alias = np.array(degree["alias"], dtype=np.int64)
+        self.nets_per_block = distributions["nets_per_block"]
+
+    @classmethod
+    def load(cls, path=DEFAULT_DISTRIBUTIONS):
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def sample_aspect_ratios(self, rng, width):
+        """Draws an aspect ratio for every width from the aspect ratios seen next to similar widths."""
+        rows = np.searchsorted(self.width_edges, width, side='left')
+        # Widths in a row without data borrow the closest row that has some
+        known_rows = np.array(sorted(self.aspect_rows))
+        nearest = np.searchsorted(known_rows, rows).clip(0, len(known_rows) - 1)
+        below = (nearest - 1).clip(0)
+        nearest = np.where(np.abs(known_rows[below] - rows) < np.abs(known_rows[nearest] - rows), below, nearest)
+        rows = known_rows[nearest]
+
+        aspect_bins = np.empty(len(width), dtype=np.int64)
+        for row in np.unique(rows).tolist():
+            in_row = rows == row
+            bins, prob, alias = self.aspect_rows[row]
+            aspect_bins[in_row] = bins[sample_alias(rng, prob, alias, in_row.sum())]
+
+        # Log-uniform within the bin, which the observed range clips at both ends
+        low = np.clip(self.aspect_edges[aspect_bins], *self.aspect_range)
+        high = np.clip(self.aspect_edges[aspect_bins + 1], *self.aspect_range)
+        return low * (high / low) ** rng.random(len(width))
+
+    def sample_blocks(self, rng, num_blocks):
+        """Draws the width, height and power of num_blocks blocks."""
+        width = sample_inverse_cdf(rng, self.width_table, num_blocks)
+        height = width / self.sample_aspect_ratios(rng, width)
+        power = sample_inverse_cdf(rng, self.power_table, num_blocks)
+        return width, height, power
+
+    def sample_degrees(self, rng, num_nets):
+        """Draws num_nets net degrees."""
+        return self.degrees[sample_alias(rng, self.degree_prob, self.degree_alias, num_nets)]
@@ -0,0 +1,197 @@
+import numpy as np
+
+from netlist import Netlist
+from shape_curves import DEFAULT_NUM_SHAPES, shape_functions
+
+# Bookshelf orientations that turn a block by 90 degrees, swapping its width and height
+_TURNED = {'E', 'W', 'FE', 'FW'}
+
+
+def read_placement(pl_path, netlist):
+    """
+    Reads a Bookshelf .pl placement: '<name> <x> <y> [: <orientation>]' lines after a 'UCLA pl' header.
+    Returns the x and y of the lower-left corner of every node of the netlist, NaN where the placement
+    does not list it, and whether every block is turned by 90 degrees.
+    """
+    x = np.full(netlist.num_nodes, np.nan)
+    y = np.full(netlist.num_nodes, np.nan)
+    turned = np.zeros(netlist.num_blocks, dtype=bool)
+    with open(pl_path, 'r') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) < 3 or parts[0].startswith('#') or parts[0] == 'UCLA':
+                continue
+            try:
+                node = netlist.index(parts[0])
+            except KeyError:
+                continue
+            x[node], y[node] = float(parts[1]), float(parts[2])
+            if node < netlist.num_blocks and parts[-1] in _TURNED:
+                turned[node] = True
+    return x, y, turned
+
+
+def read_placements(pl_paths, netlist):
+    """Reads several placements of a netlist into (placements x nodes) and (placements x blocks) arrays."""
+    placements = [read_placement(path, netlist) for path in pl_paths]
+    return tuple(np.stack(column) for column in zip(*placements))
+
+
+def _overlap_area(x, y, width, height):
+    """
+    Total area shared by pairs of rectangles. Sweeping the rectangles sorted by their left edge,
+    only the pairs that overlap horizontally are compared, rather than all pairs.
+    """
+    order = np.argsort(x, kind='stable')
+    left, right = x[order], x[order] + width[order]
+    bottom, top = y[order], y[order] + height[order]
+    # Rectangles i < j in sweep order overlap horizontally when j starts before i ends
+    ends = np.searchsorted(left, right, side='left')
+    counts = np.maximum(ends - np.arange(len(left)) - 1, 0)
+    first = np.repeat(np.arange(len(left)), counts)
+    second = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + first + 1
+    overlap_x = np.minimum(right[first], right[second]) - np.maximum(left[first], left[second])
+    overlap_y = np.minimum(top[first], top[second]) - np.maximum(bottom[first], bottom[second])
+    return float(np.sum(np.clip(overlap_x, 0, None) * np.clip(overlap_y, 0, None)))
+
+
+class FloorplanEvaluator:
+    """
+    Scores floorplans of one netlist. The pin structure is prepared once, and every call evaluates a batch of
+    placements at once: the pins of all placements are gathered through the CSR net structure into one array
+    and reduced net by net, so the cost is a few NumPy passes over (placements x pins) values.
+
+    Refined netlists keep a single shape per block. Given the aspect ratio limits of the blocks (equal limits
+    for hard blocks), the evaluator also prepares num_shapes candidate shapes of every block, of its area,
+    so that placements can pick a shape per block.
+    """
+
+    def __init__(self, netlist, min_aspect=None, max_aspect=None, rotatable=False, num_shapes=DEFAULT_NUM_SHAPES):
+        self.netlist = netlist
+        self.shape_widths = self.shape_heights = None
+        if min_aspect is not None:
+            self.shape_widths, self.shape_heights = shape_functions(
+                netlist.width * netlist.height, min_aspect, max_aspect, rotatable, num_shapes)
+        degrees = netlist.net_degrees
+        # Nets with pins, by the offset of their first pin: reduceat cannot reduce empty segments
+        self.net_starts = netlist.net_offsets[:-1][degrees > 0]
+        self.is_block_pin = netlist.net_pins < netlist.num_blocks
+
+    def pin_coordinates(self, x, y, turned=None, shapes=None):
+        """
+        Returns the (placements x pins) coordinates of every pin: the center of its block, or the position
+        of its terminal. x and y are the lower-left corners of all nodes, NaN for unplaced ones, and shapes
+        the (placements x blocks) indices of the candidate shape of every block, None for the netlist's shapes.
+        """
+        netlist = self.netlist
+        block_width, block_height = netlist.width, netlist.height
+        if shapes is not None:
+            if self.shape_widths is None:
+                raise ValueError("Shape choices need the aspect ratio limits of the blocks")
+            blocks = np.arange(netlist.num_blocks)
+            block_width, block_height = self.shape_widths[blocks, shapes], self.shape_heights[blocks, shapes]
+        if turned is not None:
+            block_width, block_height = (np.where(turned, block_height, block_width),
+                                         np.where(turned, block_width, block_height))
+        width = np.zeros((len(x), netlist.num_nodes))
+        height = np.zeros((len(x), netlist.num_nodes))
+        width[:, :netlist.num_blocks] = block_width
+        height[:, :netlist.num_blocks] = block_height
+        pins = netlist.net_pins
+        return (x + width / 2)[:, pins], (y + height / 2)[:, pins], width, height
+
+    def hpwl(self, pin_x, pin_y):
+        """Half-perimeter wirelength of every placement; unplaced pins (NaN) are left out of their nets."""
+        starts = self.net_starts
+        with np.errstate(invalid='ignore'):
+            span_x = np.fmax.reduceat(pin_x, starts, axis=1) - np.fmin.reduceat(pin_x, starts, axis=1)
+            span_y = np.fmax.reduceat(pin_y, starts, axis=1) - np.fmin.reduceat(pin_y, starts, axis=1)
+        return np.nansum(span_x + span_y, axis=1)
+
+    def tsv_count(self, tiers):
+        """
+        Number of through-silicon vias of every placement: each net needs one per tier boundary
+        between its lowest and highest block, terminals aside.
+        """
+        block_pins = np.minimum(self.netlist.net_pins, self.netlist.num_blocks - 1)
+        pin_tiers = np.where(self.is_block_pin, tiers[:, block_pins], np.nan)
+        with np.errstate(invalid='ignore'):
+            spans = (np.fmax.reduceat(pin_tiers, self.net_starts, axis=1)
+                     - np.fmin.reduceat(pin_tiers, self.net_starts, axis=1))
+        return np.nansum(spans, axis=1).astype(np.int64)
+
+    def evaluate(self, x, y, turned=None, tiers=None, outline=None, shapes=None):
+        """
+        Evaluates placements given as (placements x nodes) lower-left corners (a single placement may be 1D),
+        with optional (placements x blocks) arrays of turned blocks, tier indices and candidate shape indices,
+        and an optional (width, height) fixed outline of every die.
+        Returns a dictionary of per-placement arrays: 'hpwl', 'outline_width', 'outline_height', 'outline_area'
+        and 'overlap' (both over the largest die), plus 'tsvs' when tiers are given and 'fits' when an outline is.
+        """
+        x, y = np.atleast_2d(x), np.atleast_2d(y)
+        num_placements, num_blocks = len(x), self.netlist.num_blocks
+        if turned is not None:
+            turned = np.broadcast_to(turned, (num_placements, num_blocks))
+        if shapes is not None:
+            shapes = np.broadcast_to(shapes, (num_placements, num_blocks))
+        tiers = np.zeros((num_placements, num_blocks), dtype=np.int64) if tiers is None else \
+            np.broadcast_to(tiers, (num_placements, num_blocks))
+
+        pin_x, pin_y, width, height = self.pin_coordinates(x, y, turned, shapes)
+        results = {'hpwl': self.hpwl(pin_x, pin_y)}
+
+        block_x, block_y = x[:, :num_blocks], y[:, :num_blocks]
+        block_width, block_height = width[:, :num_blocks], height[:, :num_blocks]
+        outline_width = np.zeros(num_placements)
+        outline_height = np.zeros(num_placements)
+        overlap = np.zeros(num_placements)
+        for tier in np.unique(tiers).tolist():
+            on_tier = tiers == tier
+            # fmax and fmin skip unplaced (NaN) blocks; a die without placed blocks comes out NaN
+            die_width = (np.fmax.reduce(np.where(on_tier, block_x + block_width, np.nan), axis=1)
+                         - np.fmin.reduce(np.where(on_tier, block_x, np.nan), axis=1))
+            die_height = (np.fmax.reduce(np.where(on_tier, block_y + block_height, np.nan), axis=1)
+                          - np.fmin.reduce(np.where(on_tier, block_y, np.nan), axis=1))
+            outline_width = np.fmax(outline_width, die_width)
+            outline_height = np.fmax(outline_height, die_height)
+            for i in np.flatnonzero(on_tier.any(axis=1)).tolist():
+                blocks = on_tier[i] & ~np.isnan(block_x[i])
+                overlap[i] += _overlap_area(block_x[i, blocks], block_y[i, blocks],
+                                            block_width[i, blocks], block_height[i, blocks])
+
+        results.update(outline_width=outline_width, outline_height=outline_height,
+                       outline_area=outline_width * outline_height, overlap=overlap)
+        if tiers.max(initial=0) > 0:
+            results['tsvs'] = self.tsv_count(tiers)
+        if outline is not None:
+            results['fits'] = (outline_width <= outline[0]) & (outline_height <= outline[1])
+        return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Evaluate Bookshelf placements of a refined netlist.")
+    parser.add_argument("netlist", type=str, help="Refined netlist file.")
+    parser.add_argument("placements", type=str, nargs="+", help="Bookshelf .pl placements of the netlist.")
+    parser.add_argument("--outline", type=float, nargs=2, metavar=("WIDTH", "HEIGHT"), default=None,
+                        help="Fixed outline the placements must fit in.")
+    parser.add_argument("--tiers", type=str, default=None,
+                        help="Tier assignment of the blocks, as written by tier_partitioning.py.")
+    args = parser.parse_args()
+
+    netlist = Netlist.read_refined(args.netlist)
+    x, y, turned = read_placements(args.placements, netlist)
+    tiers = None
+    if args.tiers:
+        from tier_partitioning import read_tiers
+        tiers = read_tiers(args.tiers, netlist)
+    results = FloorplanEvaluator(netlist).evaluate(x, y, turned, tiers, outline=args.outline)
+    for i, path in enumerate(args.placements):
+        line = (f"{path}: HPWL {results['hpwl'][i]:g}, "
+                f"outline {results['outline_width'][i]:g} x {results['outline_height'][i]:g} "
+                f"({results['outline_area'][i]:g}), overlap {results['overlap'][i]:g}")
+        if 'tsvs' in results:
+            line += f", {results['tsvs'][i]} TSVs"
+        if args.outline is not None:
+            line += ", fits" if results['fits'][i] else ", does not fit"
+        print(line)
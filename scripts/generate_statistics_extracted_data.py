@@ -1,123 +1,222 @@
+import json
 import os
-import re
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-import pandas as pd
+
+import instrumentation
+from netlist import Netlist
+from netlist_cache import NetlistCache
+from distributions import build_distributions
+from streaming_statistics import ColumnSummary, ConnectivitySummary, JointLogHistogram
+
+BLOCK_COLUMNS = ["Width", "Height", "Aspect Ratio", "Power"]
 
 def parse_file(filepath):
-    """Parses a file to extract blocks and connections."""
-    blocks = []
-    connections = []
-    with open(filepath, 'r') as file:
-        lines = file.readlines()
-        parsing_blocks = True
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            if "Blocks:" in line:
-                parsing_blocks = True
-                continue
-            if "Connections:" in line:
-                parsing_blocks = False
-                continue
-
-            if parsing_blocks:
-                parts = line.split(',')
-                name = parts[0].strip()
-                width = float(parts[1].strip())  # Allow float values
-                height = float(parts[2].strip())  # Allow float values
-                power = None if parts[3].strip() == 'None' else float(parts[3].strip())
-                blocks.append((name, width, height, power))
+    """Parses a refined netlist file into a Netlist."""
+    return Netlist.read_refined(filepath)
+
+def box_stats(summary, label=None):
+    """
+    Returns the matplotlib bxp statistics of a ColumnSummary.
+    Whiskers and fliers come from the sketch's retained items, so they are exact while the sketch is.
+    """
+    items, _ = summary.sketch.weighted_items()
+    q1, median, q3 = summary.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = items[(items >= q1 - 1.5 * iqr) & (items <= q3 + 1.5 * iqr)]
+    return {
+        "label": label, "mean": summary.mean, "med": median, "q1": q1, "q3": q3,
+        "whislo": inside.min() if len(inside) else q1, "whishi": inside.max() if len(inside) else q3,
+        "fliers": items[(items < q1 - 1.5 * iqr) | (items > q3 + 1.5 * iqr)],
+    }
+
+def summarize_files(filepaths, cache=None, sketch_size=2048):
+    """
+    Folds the given refined files into a ColumnSummary per block column and one for the connection counts.
+    Summaries of disjoint sets of files merge into the summaries of their union.
+    """
+    summaries = {column: ColumnSummary(sketch_size) for column in BLOCK_COLUMNS + ["Connection Counts"]}
+    # Joint and exact distributions the augmentation samples from
+    summaries["Width x Aspect Ratio"] = JointLogHistogram()
+    summaries["Connectivity"] = ConnectivitySummary()
+
+    for filepath in filepaths:
+        netlist = cache.load(filepath) if cache else parse_file(filepath)
+
+        # Analyze Blocks
+        summaries["Width"].update(netlist.width)
+        summaries["Height"].update(netlist.height)
+        summaries["Aspect Ratio"].update(netlist.width / netlist.height)
+        summaries["Power"].update(netlist.power)
+        summaries["Width x Aspect Ratio"].update(netlist.width, netlist.width / netlist.height)
+
+        # Analyze Connections: the number of nets, then the number of pins of each net
+        if netlist.num_nets:
+            summaries["Connection Counts"].update([netlist.num_nets])
+            summaries["Connection Counts"].update(netlist.net_degrees)
+            summaries["Connectivity"].update(netlist.net_degrees, netlist.num_blocks)
+
+    return summaries
+
+def _summarize_chunk(filepaths, cache_dir, sketch_size):
+    """
+    Worker side of the parallel mode: summarizes a chunk of files, through a cache on cache_dir if given.
+    Returns the summaries and the cache state for the parent to absorb.
+    """
+    if cache_dir is None:
+        return summarize_files(filepaths, sketch_size=sketch_size), None
+    # Eviction is left to the parent, which sees the cache usage of every worker
+    cache = NetlistCache(cache_dir, max_bytes=float('inf'))
+    return summarize_files(filepaths, cache, sketch_size), cache.state()
+
+@instrumentation.timed('summarize')
+def summarize_directories(input_dirs, cache=None, sketch_size=2048, workers=1):
+    """
+    Summarizes every file of the input directories.
+    With several workers, chunks of files are summarized in a process pool and the partial summaries merged.
+    """
+    filepaths = []
+    for input_dir in input_dirs:
+        for filename in sorted(os.listdir(input_dir)):
+            filepath = os.path.join(input_dir, filename)
+            if os.path.isfile(filepath):
+                filepaths.append(filepath)
+
+    if workers == 1 or len(filepaths) <= 1:
+        return summarize_files(filepaths, cache, sketch_size)
+
+    workers = workers or os.cpu_count()
+    # A few chunks per worker keep the pool busy when file sizes differ
+    num_chunks = min(len(filepaths), 4 * workers)
+    chunks = [filepaths[i::num_chunks] for i in range(num_chunks)]
+    cache_dir = cache.cache_dir if cache else None
+
+    summaries = None
+    worker_settings = instrumentation.settings()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for (partial, cache_state), state in executor.map(instrumentation.call, [worker_settings] * num_chunks,
+                                                          [_summarize_chunk] * num_chunks, chunks,
+                                                          [cache_dir] * num_chunks, [sketch_size] * num_chunks):
+            instrumentation.absorb(state)
+            if cache_state is not None:
+                cache.absorb(cache_state)
+            if summaries is None:
+                summaries = partial
             else:
-                connections.append(line.split())
+                for column, summary in partial.items():
+                    summaries[column].merge(summary)
+    return summaries
 
-    return blocks, connections
+def _number(value):
+    """Converts a numpy scalar to a JSON number, with None for NaN."""
+    value = float(value)
+    return None if np.isnan(value) else value
 
-def analyze_and_visualize(input_dir, output_dir):
-    """Analyzes files in the input directory and generates visualizations in the output directory."""
-    os.makedirs(output_dir, exist_ok=True)
-    
-    block_data = []
-    connection_counts = []
-
-    for filename in os.listdir(input_dir):
-        filepath = os.path.join(input_dir, filename)
-        if os.path.isfile(filepath):
-            blocks, connections = parse_file(filepath)
-            
-            # Analyze Blocks
-            for name, width, height, power in blocks:
-                aspect_ratio = width / height
-                block_data.append((name, width, height, aspect_ratio, power))
-
-            # Analyze Connections
-            if connections:
-                connection_counts.append(len(connections))
-                avg_connections = [len(conn) for conn in connections]
-                connection_counts.extend(avg_connections)
-
-    # Convert block data to DataFrame
-    block_df = pd.DataFrame(block_data, columns=["Name", "Width", "Height", "Aspect Ratio", "Power"])
-    
-    # Histograms for Width, Height, Aspect Ratio, and Power
-    for column in ["Width", "Height", "Aspect Ratio", "Power"]:
-        plt.figure()
-        data = block_df[column].dropna()
-        plt.hist(data, bins=20, alpha=0.7, color='blue', edgecolor='black')
-        plt.title(f"Histogram of {column}")
-        plt.xlabel(column)
-        plt.ylabel("Frequency")
-        plt.grid(True)
-        plt.savefig(os.path.join(output_dir, f"{column.lower()}_histogram.png"))
-        plt.close()
-
-    # Whisker plot for Connection Counts
-    if connection_counts:
-        plt.figure()
-        plt.boxplot(connection_counts, vert=False, patch_artist=True)
-        plt.title("Whisker Plot of Connection Counts")
-        plt.xlabel("Number of Connections")
-        plt.grid(True)
-        plt.savefig(os.path.join(output_dir, "connection_counts_whisker_plot.png"))
-        plt.close()
-
-    # Box plot for Connections Per Connection
-    if connection_counts:
-        plt.figure()
-        plt.boxplot(connection_counts, patch_artist=True)
-        plt.title("Box Plot of Average Connections")
-        plt.ylabel("Number of Connections")
-        plt.grid(True)
-        plt.savefig(os.path.join(output_dir, "connections_per_connection_box_plot.png"))
-        plt.close()
-
-    # Create summary statistics file
-    summary_stats = {}
-
-    for column in ["Width", "Power", "Aspect Ratio"]:
-        data = block_df[column].dropna()
-        summary_stats[column] = {
-            "Average": data.mean(),
-            "1st Quartile": data.quantile(0.25),
-            "3rd Quartile": data.quantile(0.75),
-            "Median": data.median()
-        }
-    
-    # Save statistics to a text file
-    stats_file = os.path.join(output_dir, "summary_statistics.txt")
+def column_statistics(summary, bins=20):
+    """
+    Returns the artifact entry of a ColumnSummary: its moments, five-number summary,
+    quartile error bound, an evenly binned histogram and the box plot statistics.
+    """
+    q1, median, q3 = summary.quantile([0.25, 0.5, 0.75])
+    counts, edges = summary.histogram_counts(bins)
+    box = box_stats(summary)
+    return {
+        "count": summary.count,
+        "mean": _number(summary.mean),
+        "min": _number(summary.sketch.min) if summary.count else None,
+        "1st Quartile": _number(q1),
+        "median": _number(median),
+        "3rd Quartile": _number(q3),
+        "max": _number(summary.sketch.max) if summary.count else None,
+        "rank_error_bound": summary.error_bound(),
+        "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+        "box": {key: (_number(value) if key not in ("label", "fliers") else value)
+                for key, value in dict(box, fliers=[float(v) for v in box["fliers"]]).items()},
+    }
+
+def write_summary(artifact, stats_file):
+    """Writes the summary_statistics.txt report of a statistics artifact."""
     with open(stats_file, 'w') as f:
-        for column, stats in summary_stats.items():
+        for column in ["Width", "Power", "Aspect Ratio"]:
+            stats = artifact["columns"][column]
             f.write(f"{column}:\n")
-            for stat, value in stats.items():
-                f.write(f"  {stat}: {value:.2f}\n")
+            for stat, key in [("Average", "mean"), ("1st Quartile", "1st Quartile"),
+                              ("3rd Quartile", "3rd Quartile"), ("Median", "median")]:
+                value = stats[key]
+                f.write(f"  {stat}: {value if value is not None else float('nan'):.2f}\n")
+            # Worst-case rank error of the quartiles
+            f.write(f"  Quartile rank error: {100 * stats['rank_error_bound']:.2f}%\n")
             f.write("\n")
 
+def analyze_and_visualize(input_dir, output_dir, cache=None, sketch_size=2048, workers=1, plots=True):
+    """
+    Analyzes files in the input directory, or a list of directories, and writes the statistics artifact
+    statistics.json, the distributions.json artifact of the augmentation, the summary_statistics.txt report
+    and, unless plots is False, the figures to the output directory. Every file is folded into running sums and quantile sketches,
+    so memory does not grow with the corpus. If a NetlistCache is given, files are parsed through it.
+    workers > 1 (or None for all cores) spreads the files and the figures over process pools.
+    Returns the artifact.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    input_dirs = [input_dir] if isinstance(input_dir, str) else list(input_dir)
+    summaries = summarize_directories(input_dirs, cache, sketch_size, workers)
+
+    with instrumentation.span('write_artifacts'):
+        # Relative to the output directory, so that the artifact does not depend on where the repository lives
+        artifact = {"inputs": [os.path.relpath(d, output_dir).replace(os.sep, '/') for d in input_dirs],
+                    "columns": {column: column_statistics(summary) for column, summary in summaries.items()
+                                if isinstance(summary, ColumnSummary)}}
+        with open(os.path.join(output_dir, "statistics.json"), 'w') as f:
+            json.dump(artifact, f)
+        # Distributions for data_augmentation.py to sample from
+        with open(os.path.join(output_dir, "distributions.json"), 'w') as f:
+            json.dump(build_distributions(summaries), f)
+        write_summary(artifact, os.path.join(output_dir, "summary_statistics.txt"))
+
+    for column in artifact["columns"]:
+        summary = summaries[column]
+        exactness = "exact" if summary.sketch.is_exact else f"rank error <= {100 * summary.error_bound():.2f}%"
+        print(f"{column}: {summary.count} values, {summary.sketch.num_retained} retained ({exactness})")
+
+    if plots:
+        # Imported here so that runs without plots never load matplotlib
+        from render_statistics import render_all
+        with instrumentation.span('render'):
+            render_all(artifact, output_dir, workers)
+    return artifact
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Analyze and visualize block and connection data.")
-    parser.add_argument("input_dir", type=str, help="Path to the directory containing input files.")
+    parser.add_argument("input_dir", type=str, nargs="+",
+                        help="Path to the directory containing input files; several directories are analyzed together.")
     parser.add_argument("output_dir", type=str, help="Path to the directory where output plots will be saved.")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Directory of the parse cache (default: a per-user cache directory).")
+    parser.add_argument("--cache-size-mb", type=float, default=1024,
+                        help="Size above which the least recently used cache entries are evicted.")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every file without the parse cache.")
+    parser.add_argument("--sketch-size", type=int, default=2048,
+                        help="Capacity k of the quantile sketches; quantiles are exact up to about k values.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes; 0 uses all cores (default: 1).")
+    parser.add_argument("--no-plots", action="store_true",
+                        help="Only write statistics.json and summary_statistics.txt, without rendering figures.")
+    instrumentation.add_arguments(parser)
     args = parser.parse_args()
+    if args.report:
+        instrumentation.enable(args.trace_memory)
+    workers = args.workers or None
 
-    analyze_and_visualize(args.input_dir, args.output_dir)
+    if args.no_cache:
+        analyze_and_visualize(args.input_dir, args.output_dir, sketch_size=args.sketch_size, workers=workers,
+                              plots=not args.no_plots)
+    else:
+        with NetlistCache(args.cache_dir, max_bytes=int(args.cache_size_mb * 1e6)) as cache:
+            analyze_and_visualize(args.input_dir, args.output_dir, cache, args.sketch_size, workers,
+                                  plots=not args.no_plots)
+        print(cache.report())
+    if args.report:
+        instrumentation.write_report(args.report, script='generate_statistics_extracted_data')
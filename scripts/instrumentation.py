@@ -0,0 +1,213 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Whether spans and counters are recorded; everything below is a no-op until enable() is called
+_enabled = False
+_trace_memory = False
+_start = 0.0
+# Timings and counters of every span path ('extract_SMU/parse', ...), and counters summed over all spans
+_spans = {}
+_totals = {}
+# Paths of the open spans, innermost last, and the memory peak seen inside the run and each of them
+_stack = []
+_peaks = []
+# Highest memory peak of any worker process absorbed
+_worker_peak = 0
+
+
+class _Span:
+    __slots__ = ('path', 'start')
+
+    def __init__(self, name):
+        self.path = f"{_stack[-1]}/{name}" if _stack else name
+
+    def __enter__(self):
+        if _trace_memory:
+            # The peak of the enclosing span so far, before the peak is reset for this one
+            _peaks[-1] = max(_peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            _peaks.append(0)
+        _stack.append(self.path)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        _stack.pop()
+        record = _record(self.path)
+        record['calls'] += 1
+        record['seconds'] += seconds
+        if _trace_memory:
+            peak = max(_peaks.pop(), tracemalloc.get_traced_memory()[1])
+            record['peak_memory_bytes'] = max(record.get('peak_memory_bytes', 0), peak)
+            _peaks[-1] = max(_peaks[-1], peak)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _peak_memory():
+    return max(_peaks[0], tracemalloc.get_traced_memory()[1]) if tracemalloc.is_tracing() else _peaks[0]
+
+
+def _record(path):
+    if path not in _spans:
+        _spans[path] = {'calls': 0, 'seconds': 0.0}
+    return _spans[path]
+
+
+def enable(trace_memory=False):
+    """Starts recording, clearing anything recorded before. With trace_memory, tracemalloc peaks are kept too."""
+    global _enabled, _trace_memory, _start, _worker_peak
+    _spans.clear()
+    _totals.clear()
+    _stack.clear()
+    _peaks[:] = [0]
+    _enabled, _trace_memory, _worker_peak = True, trace_memory, 0
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _start = time.perf_counter()
+
+
+def disable():
+    """Stops recording; what was recorded stays available to report()."""
+    global _enabled, _trace_memory
+    if _trace_memory:
+        _peaks[0] = _peak_memory()
+        tracemalloc.stop()
+    _enabled = _trace_memory = False
+
+
+def enabled():
+    return _enabled
+
+
+def span(name):
+    """
+    Returns a context manager timing a block under name, nested below the spans open around it.
+    When recording is disabled this is a shared object whose enter and exit do nothing.
+    """
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def timed(name):
+    """Decorator running every call of a function in a span."""
+    def decorate(function):
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(name):
+                return function(*args, **kwargs)
+        wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = function.__name__, function.__doc__, function
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """Adds value to a counter of the innermost open span and to the run total."""
+    if not _enabled:
+        return
+    _totals[name] = _totals.get(name, 0) + value
+    if _stack:
+        record = _record(_stack[-1])
+        record[name] = record.get(name, 0) + value
+
+
+def count_files(paths, direction):
+    """Counts files read or written ('read' or 'written') and their bytes."""
+    if not _enabled:
+        return
+    count(f'files_{direction}', len(paths))
+    count(f'bytes_{direction}', sum(os.path.getsize(path) for path in paths))
+
+
+def count_netlist(netlist):
+    """Counts the blocks, nets and pins of a netlist (or anything with num_blocks, num_nets and num_pins)."""
+    if not _enabled:
+        return
+    count('blocks', int(netlist.num_blocks))
+    count('nets', int(netlist.num_nets))
+    count('pins', int(netlist.num_pins))
+
+
+def settings():
+    """The recording settings to hand to worker processes through call(), None when disabled."""
+    return {'trace_memory': _trace_memory} if _enabled else None
+
+
+def snapshot():
+    """Returns what was recorded, for a parent process to absorb()."""
+    peak = _peak_memory() if _trace_memory else None
+    return {'spans': {path: dict(record) for path, record in _spans.items()}, 'totals': dict(_totals),
+            'peak_memory_bytes': peak}
+
+
+def call(worker_settings, function, *args):
+    """
+    Worker side of process pools: runs function(*args), recording with the settings of the parent if it
+    records. Returns the result and the snapshot of the call, or None when the parent does not record.
+    """
+    if worker_settings is None:
+        return function(*args), None
+    enable(**worker_settings)
+    try:
+        result = function(*args)
+        return result, snapshot()
+    finally:
+        disable()
+
+
+def absorb(state):
+    """Merges the snapshot of a worker into this process, below the spans open here."""
+    global _worker_peak
+    if state is None or not _enabled:
+        return
+    prefix = f"{_stack[-1]}/" if _stack else ""
+    for path, worker_record in state['spans'].items():
+        record = _record(prefix + path)
+        for name, value in worker_record.items():
+            record[name] = max(record.get(name, 0), value) if name == 'peak_memory_bytes' \
+                else record.get(name, 0) + value
+    for name, value in state['totals'].items():
+        _totals[name] = _totals.get(name, 0) + value
+    if state['peak_memory_bytes'] is not None:
+        _worker_peak = max(_worker_peak, state['peak_memory_bytes'])
+
+
+def report(**metadata):
+    """Returns the report of the run: its metadata, wall time, counter totals and every span."""
+    result = dict(metadata, argv=sys.argv, seconds=round(time.perf_counter() - _start, 6), totals=dict(_totals))
+    if _trace_memory:
+        result['peak_memory_bytes'] = _peak_memory()
+        if _worker_peak:
+            result['worker_peak_memory_bytes'] = _worker_peak
+    result['spans'] = {path: dict(record, seconds=round(record['seconds'], 6))
+                       for path, record in sorted(_spans.items())}
+    return result
+
+
+def write_report(path, **metadata):
+    """Writes the report of the run as JSON."""
+    with open(path, 'w') as file:
+        json.dump(report(**metadata), file, indent=2)
+
+
+def add_arguments(parser):
+    """Adds the --report and --trace-memory options of a script to an argparse parser."""
+    parser.add_argument("--report", type=str, default=None,
+                        help="Path of a JSON report of the time spent in every stage and the files, blocks, nets, "
+                             "pins and bytes handled (default: no report, no recording).")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also record the peak traced memory of every stage in the report (slower).")
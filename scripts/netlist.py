@@ -0,0 +1,296 @@
+import array
+import os
+from itertools import repeat
+
+import numpy as np
+
+import instrumentation
+
+# Number of blocks or nets formatted at once by write_refined
+_WRITE_CHUNK = 1 << 16
+
+
+def _format_column(values, spec):
+    """
+    Formats a float column with a format spec, writing NaN as None.
+    Integral values that the spec would print as plain integers take a faster path.
+    """
+    known = ~np.isnan(values)
+    integral = np.all(values[known] == np.rint(values[known]))
+    if spec in ('g', '.0f', 'd') and integral and (spec != 'g' or np.all(np.abs(values[known]) < 1e6)):
+        strings = np.rint(np.where(known, values, 0)).astype(np.int64).astype(str).astype(object)
+    else:
+        strings = np.array(list(map(format, values.tolist(), repeat(spec))), dtype=object)
+    strings[~known] = 'None'
+    return strings
+
+
+class Netlist:
+    """
+    Compact, array-backed netlist shared by the extraction, statistics and augmentation scripts.
+
+    Nodes are the blocks followed by every other name the nets refer to (terminals, pads, signals),
+    so names[:num_blocks] are the block names. Block dimensions and power are NumPy columns, with
+    NaN marking an unknown power. Nets are stored as CSR hyperedges: the pins of net i are
+    net_pins[net_offsets[i]:net_offsets[i + 1]], each pin being an index into names.
+    """
+
+    def __init__(self, names, num_blocks, width, height, power, net_names, net_offsets, net_pins):
+        self.names = names
+        self.num_blocks = num_blocks
+        self.width = np.asarray(width, dtype=np.float64)
+        self.height = np.asarray(height, dtype=np.float64)
+        self.power = np.asarray(power, dtype=np.float64)
+        self.net_names = net_names
+        self.net_offsets = np.asarray(net_offsets, dtype=np.int64)
+        self.net_pins = np.asarray(net_pins, dtype=np.int32)
+        self._index = None
+
+    @property
+    def num_nodes(self):
+        return len(self.names)
+
+    @property
+    def num_nets(self):
+        return len(self.net_offsets) - 1
+
+    @property
+    def num_pins(self):
+        return len(self.net_pins)
+
+    @property
+    def block_names(self):
+        return self.names[:self.num_blocks]
+
+    @property
+    def aspect_ratio(self):
+        """Width over height of every block."""
+        return self.width / self.height
+
+    @property
+    def net_degrees(self):
+        """Number of pins of every net."""
+        return np.diff(self.net_offsets)
+
+    def net(self, i):
+        """Returns the node indices of the pins of net i."""
+        return self.net_pins[self.net_offsets[i]:self.net_offsets[i + 1]]
+
+    def index(self, name):
+        """Returns the node index of a name (the first block when a block name is repeated)."""
+        if self._index is None:
+            self._index = {}
+            for i, node_name in enumerate(self.names):
+                self._index.setdefault(node_name, i)
+        return self._index[name]
+
+    @instrumentation.timed('write_refined')
+    def write_refined(self, file_path, dimension_format='g', power_format='g'):
+        """
+        Writes the netlist in the refined Blocks/Connections format.
+        Dimensions and power are formatted with the given format specs; an unknown power is written as None.
+        Columns are formatted and joined a chunk of rows at a time rather than line by line.
+        The netlist is written to a file of its own and then renamed over file_path, so that a hardlink to
+        an earlier version (e.g. a deduplicated copy) keeps that version rather than being rewritten too.
+        """
+        temp_path = f"{file_path}.{os.getpid()}.part"
+        try:
+            with open(temp_path, 'w') as file:
+                self._write_refined(file, dimension_format, power_format)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        instrumentation.count_files([file_path], 'written')
+
+    def _write_refined(self, file, dimension_format, power_format):
+        names = self.names
+        file.write("Blocks:\n")
+        for start in range(0, self.num_blocks, _WRITE_CHUNK):
+            stop = min(start + _WRITE_CHUNK, self.num_blocks)
+            with instrumentation.span('format'):
+                rows = np.empty((stop - start, 8), dtype=object)
+                rows[:, 0] = names[start:stop]
+                rows[:, 2] = _format_column(self.width[start:stop], dimension_format)
+                rows[:, 4] = _format_column(self.height[start:stop], dimension_format)
+                rows[:, 6] = _format_column(self.power[start:stop], power_format)
+                rows[:, 1::2] = ', '
+                rows[:, 7] = '\n'
+                text = ''.join(rows.ravel().tolist())
+            with instrumentation.span('write'):
+                file.write(text)
+
+        file.write("\nConnections:\n")
+        node_names = np.array(names, dtype=object)
+        for start in range(0, self.num_nets, _WRITE_CHUNK):
+            stop = min(start + _WRITE_CHUNK, self.num_nets)
+            with instrumentation.span('format'):
+                offsets = self.net_offsets[start:stop + 1] - self.net_offsets[start]
+                # Each net is its name followed by its pins, every token followed by a separator
+                name_positions = offsets[:-1] + np.arange(stop - start)
+                tokens = np.empty(2 * (offsets[-1] + stop - start), dtype=object)
+                is_pin = np.ones(len(tokens) // 2, dtype=bool)
+                is_pin[name_positions] = False
+                tokens[0::2][name_positions] = self.net_names[start:stop]
+                tokens[0::2][is_pin] = node_names[self.net_pins[self.net_offsets[start]:self.net_offsets[stop]]]
+                tokens[1::2] = ' '
+                tokens[1::2][offsets[1:] + np.arange(stop - start)] = ';\n'
+                text = ''.join(tokens.tolist())
+            with instrumentation.span('write'):
+                file.write(text)
+
+    @classmethod
+    @instrumentation.timed('read_refined')
+    def read_refined(cls, file_path):
+        """
+        Reads a netlist in the refined Blocks/Connections format.
+        Nets are terminated by ';' and may span several lines; files without any ';'
+        in their Connections section hold one net per line.
+        """
+        builder = NetlistBuilder()
+        parsing_blocks = True
+        uses_semicolons = False
+        pending_lines = []
+        statement = []
+
+        with open(file_path, 'r') as file:
+            for line in file:
+                stripped = line.strip()
+                if not stripped:
+                    continue
+                if "Blocks:" in stripped:
+                    parsing_blocks = True
+                    continue
+                if "Connections:" in stripped:
+                    parsing_blocks = False
+                    continue
+
+                if parsing_blocks:
+                    parts = stripped.split(',')
+                    power = parts[3].strip()
+                    builder.add_block(parts[0].strip(), float(parts[1]), float(parts[2]),
+                                      None if power == 'None' else float(power))
+                    continue
+
+                if not uses_semicolons:
+                    if ';' not in stripped:
+                        # Undecided until the first ';' shows up
+                        pending_lines.append(stripped)
+                        continue
+                    uses_semicolons = True
+                    for pending in pending_lines:
+                        statement.extend(pending.split())
+                    pending_lines = []
+
+                *complete, rest = stripped.split(';')
+                for part in complete:
+                    statement.extend(part.split())
+                    if statement:
+                        builder.add_net(statement[0], statement[1:])
+                    statement = []
+                statement.extend(rest.split())
+
+        for pending in pending_lines:
+            tokens = pending.split()
+            builder.add_net(tokens[0], tokens[1:])
+        if statement:
+            builder.add_net(statement[0], statement[1:])
+
+        netlist = builder.build()
+        instrumentation.count_files([file_path], 'read')
+        instrumentation.count_netlist(netlist)
+        return netlist
+
+
+class NetlistBuilder:
+    """
+    Incrementally collects blocks and nets into compact arrays and builds a Netlist.
+    Nets may refer to blocks that are only added later; pins that never become a block
+    end up as extra nodes after the blocks.
+    """
+
+    def __init__(self):
+        self._name_ids = {}
+        self._names = []
+        self._block_name_ids = array.array('i')
+        self._width = array.array('d')
+        self._height = array.array('d')
+        self._power = array.array('d')
+        self._net_names = []
+        self._net_offsets = array.array('q', [0])
+        self._net_pins = array.array('i')
+
+    def _intern(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._name_ids[name] = name_id
+            self._names.append(name)
+        return name_id
+
+    @property
+    def num_blocks(self):
+        return len(self._block_name_ids)
+
+    def add_block(self, name, width, height, power=None):
+        """Adds a block; a power of None is stored as unknown."""
+        self._block_name_ids.append(self._intern(name))
+        self._width.append(width)
+        self._height.append(height)
+        self._power.append(np.nan if power is None else power)
+
+    def add_net(self, name, pin_names):
+        """Adds a net connecting the given block or terminal names."""
+        self._net_names.append(name)
+        intern = self._intern
+        self._net_pins.extend(intern(pin) for pin in pin_names)
+        self._net_offsets.append(len(self._net_pins))
+
+    def add_blocks(self, names, width, height, power=None):
+        """Adds many blocks at once from a list of names and arrays of their dimensions and power."""
+        intern = self._intern
+        self._block_name_ids.extend(intern(name) for name in names)
+        self._width.frombytes(np.asarray(width, dtype=np.float64).tobytes())
+        self._height.frombytes(np.asarray(height, dtype=np.float64).tobytes())
+        power = np.full(len(names), np.nan) if power is None else np.asarray(power, dtype=np.float64)
+        self._power.frombytes(power.tobytes())
+
+    def add_nets(self, names, offsets, pin_names):
+        """
+        Adds many nets at once: the pins of net i are pin_names[offsets[i]:offsets[i + 1]],
+        with offsets starting at 0.
+        """
+        self._net_names.extend(names)
+        intern = self._intern
+        base = len(self._net_pins)
+        self._net_pins.extend(intern(pin) for pin in pin_names)
+        self._net_offsets.frombytes((np.asarray(offsets[1:], dtype=np.int64) + base).tobytes())
+
+    def build(self):
+        """Returns the collected data as a Netlist with the blocks as its first nodes."""
+        num_names = len(self._names)
+        block_name_ids = np.frombuffer(self._block_name_ids, dtype=np.int32)
+        num_blocks = len(block_name_ids)
+
+        # Each name becomes its first block, or an extra node after the blocks
+        node_of_name = np.full(num_names, -1, dtype=np.int64)
+        unique_ids, first_blocks = np.unique(block_name_ids, return_index=True)
+        node_of_name[unique_ids] = first_blocks
+        other_ids = np.flatnonzero(node_of_name < 0)
+        node_of_name[other_ids] = num_blocks + np.arange(len(other_ids))
+
+        names = self._names
+        node_names = [names[i] for i in block_name_ids.tolist()] + [names[i] for i in other_ids.tolist()]
+        net_pins = node_of_name[np.frombuffer(self._net_pins, dtype=np.int32)].astype(np.int32)
+
+        return Netlist(
+            node_names,
+            num_blocks,
+            np.frombuffer(self._width, dtype=np.float64).copy(),
+            np.frombuffer(self._height, dtype=np.float64).copy(),
+            np.frombuffer(self._power, dtype=np.float64).copy(),
+            self._net_names,
+            np.frombuffer(self._net_offsets, dtype=np.int64).copy(),
+            net_pins,
+        )
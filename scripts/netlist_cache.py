@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from netlist import Netlist
+
+# Bump whenever the blob layout or the refined-format reader changes
+CACHE_FORMAT_VERSION = 1
+
+_MAGIC = b'NLC1'
+_ALIGNMENT = 64
+_ARRAYS = ('width', 'height', 'power', 'net_offsets', 'net_pins')
+
+
+def default_cache_dir():
+    """Returns the per-user directory for the parse cache."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, '3d-ic-floorplanning-netlists', 'parse_cache')
+
+
+def write_blob(netlist, blob_path):
+    """
+    Writes a Netlist as a binary blob: a JSON header with the names and array layout,
+    followed by the raw arrays aligned so they can be memory-mapped.
+    """
+    arrays = {name: np.ascontiguousarray(getattr(netlist, name)) for name in _ARRAYS}
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        layout[name] = [offset, len(values), values.dtype.str]
+        offset += -(-values.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+    header = json.dumps({
+        'num_blocks': netlist.num_blocks,
+        'names': netlist.names,
+        'net_names': netlist.net_names,
+        'arrays': layout,
+    }).encode('utf-8')
+    data_start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGNMENT) * _ALIGNMENT
+
+    directory = os.path.dirname(blob_path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(_MAGIC + struct.pack('<Q', len(header)) + header)
+            for name, values in arrays.items():
+                file.seek(data_start + layout[name][0])
+                file.write(values.tobytes())
+            file.truncate(data_start + offset)
+        try:
+            os.replace(temp_path, blob_path)
+        except PermissionError:
+            # On Windows a blob memory-mapped by a live Netlist cannot be replaced. Blobs are content-addressed,
+            # so the one in place already holds the same netlist
+            if not os.path.exists(blob_path):
+                raise
+            os.unlink(temp_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def read_blob(blob_path):
+    """Reads a blob written by write_blob, memory-mapping its arrays."""
+    with open(blob_path, 'rb') as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"Not a netlist cache blob: {blob_path}")
+        header_length, = struct.unpack('<Q', file.read(8))
+        header = json.loads(file.read(header_length).decode('utf-8'))
+    data_start = -(-(len(_MAGIC) + 8 + header_length) // _ALIGNMENT) * _ALIGNMENT
+
+    arrays = {}
+    for name, (offset, count, dtype) in header['arrays'].items():
+        if count:
+            arrays[name] = np.memmap(blob_path, dtype=dtype, mode='r', offset=data_start + offset, shape=(count,))
+        else:
+            arrays[name] = np.empty(0, dtype=dtype)
+
+    return Netlist(header['names'], header['num_blocks'], arrays['width'], arrays['height'], arrays['power'],
+                   header['net_names'], arrays['net_offsets'], arrays['net_pins'])
+
+
+class NetlistCache:
+    """
+    Persistent cache of parsed refined netlists.
+
+    Blobs are keyed by a hash of the file content. An index remembers the size and mtime
+    each path had when it was hashed, so unchanged files are looked up without being read.
+    The least recently used blobs are evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=1 << 30):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index_path = os.path.join(self.cache_dir, 'index.json')
+        self._paths = {}
+        self._blobs = {}
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, 'r') as file:
+                    index = json.load(file)
+                if index.get('version') == CACHE_FORMAT_VERSION:
+                    self._paths = index['paths']
+                    self._blobs = index['blobs']
+            except (OSError, ValueError, KeyError):
+                pass  # A damaged index only costs a rebuild
+        # Blobs that could not be removed while memory-mapped are evicted now
+        self._evict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _blob_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.nlc")
+
+    def _key(self, file_path, stat):
+        entry = self._paths.get(file_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['key']
+
+        digest = hashlib.sha256(f"v{CACHE_FORMAT_VERSION}:".encode())
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        key = digest.hexdigest()
+        self._paths[file_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'key': key}
+        return key
+
+    def load(self, file_path):
+        """Returns the Netlist of a refined file, parsing it only on a cache miss."""
+        file_path = os.path.abspath(file_path)
+        key = self._key(file_path, os.stat(file_path))
+        blob_path = self._blob_path(key)
+
+        if key in self._blobs and os.path.exists(blob_path):
+            try:
+                netlist = read_blob(blob_path)
+            except (OSError, ValueError):
+                netlist = None
+            if netlist is not None:
+                self.hits += 1
+                self._blobs[key]['last_used'] = time.time()
+                return netlist
+
+        self.misses += 1
+        netlist = Netlist.read_refined(file_path)
+        write_blob(netlist, blob_path)
+        self._blobs[key] = {'bytes': os.path.getsize(blob_path), 'last_used': time.time()}
+        self._evict()
+        return netlist
+
+    def _evict(self):
+        total = sum(blob['bytes'] for blob in self._blobs.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self._blobs, key=lambda k: self._blobs[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._blob_path(key))
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # Still memory-mapped by a live Netlist (on Windows): left for the eviction of a later run
+                continue
+            total -= self._blobs.pop(key)['bytes']
+            self.evictions += 1
+        self._paths = {path: entry for path, entry in self._paths.items() if entry['key'] in self._blobs}
+
+    def state(self):
+        """Returns the index entries and counters of this cache, to be absorbed by another instance."""
+        return {'paths': self._paths, 'blobs': self._blobs, 'hits': self.hits, 'misses': self.misses}
+
+    def absorb(self, state):
+        """
+        Merges the state of a cache that another process used on the same directory.
+        Blobs are content-addressed, so both instances agree on every key they share.
+        """
+        self._paths.update(state['paths'])
+        for key, blob in state['blobs'].items():
+            if key not in self._blobs or blob['last_used'] > self._blobs[key]['last_used']:
+                self._blobs[key] = blob
+        self.hits += state['hits']
+        self.misses += state['misses']
+        self._evict()
+
+    def close(self):
+        """Writes the index back to disk."""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump({'version': CACHE_FORMAT_VERSION, 'paths': self._paths, 'blobs': self._blobs}, file)
+        os.replace(temp_path, self._index_path)
+
+    def report(self):
+        """Returns a one-line summary of the cache activity."""
+        lookups = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+        cached_bytes = sum(blob['bytes'] for blob in self._blobs.values())
+        return (f"Parse cache: {self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate), "
+                f"{self.evictions} evictions, {cached_bytes / 1e6:.1f} MB cached in {self.cache_dir}")
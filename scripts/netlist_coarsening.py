@@ -0,0 +1,226 @@
+import os
+
+import numpy as np
+
+from netlist import Netlist
+
+# Nets over more blocks than this are left out of the clustering scores, as in hMETIS: they say little about
+# which blocks belong together and their pairs would dominate the cost
+MAX_SCORED_DEGREE = 64
+
+# Rounds of heavy-edge matching per level
+MATCHING_ROUNDS = 3
+
+
+def block_affinity(netlist):
+    """
+    Returns the clique-model affinity of every pair of connected blocks as (first, second, weight) arrays, with
+    each pair listed in both directions: a net over d blocks adds 1 / (d - 1) to the weight of each of its pairs.
+    The pairs of all nets are generated at once, so the cost is linear in the sum of squared net degrees.
+    """
+    num_blocks = netlist.num_blocks
+    is_block = netlist.net_pins < num_blocks
+    net_of_pin = np.repeat(np.arange(netlist.num_nets), netlist.net_degrees)[is_block]
+    pins = netlist.net_pins[is_block].astype(np.int64)
+    degrees = np.bincount(net_of_pin, minlength=netlist.num_nets)
+    scored = (degrees[net_of_pin] > 1) & (degrees[net_of_pin] <= MAX_SCORED_DEGREE)
+    pins, net_of_pin = pins[scored], net_of_pin[scored]
+    # Whole nets were dropped, so the pins of every net are still contiguous
+    first = np.flatnonzero(np.concatenate(([True], net_of_pin[1:] != net_of_pin[:-1]))) if len(pins) else pins
+    starts = np.repeat(first, np.diff(np.append(first, len(pins))))
+    pin_degrees = degrees[net_of_pin]
+
+    # Every pin paired with every pin of its net, itself included, then the self pairs dropped
+    first_pin = np.repeat(np.arange(len(pins)), pin_degrees)
+    second_pin = np.repeat(starts, pin_degrees) + (np.arange(len(first_pin))
+                                                   - np.repeat(np.cumsum(pin_degrees) - pin_degrees, pin_degrees))
+    first_block, second_block = pins[first_pin], pins[second_pin]
+    different = first_block != second_block
+    keys = first_block[different] * num_blocks + second_block[different]
+    weights = 1.0 / (pin_degrees[first_pin[different]] - 1)
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys // num_blocks, keys % num_blocks, np.bincount(inverse, weights=weights)
+
+
+def _best_neighbours(first, second, scores, eligible, num_blocks):
+    """Returns the eligible neighbour of highest score of every block, -1 where none is eligible, and its score."""
+    best = np.full(num_blocks, -1)
+    best_score = np.zeros(num_blocks)
+    first, second, scores = first[eligible], second[eligible], scores[eligible]
+    order = np.lexsort((-scores, first))
+    heads = order[np.flatnonzero(np.concatenate(([True], first[order][1:] != first[order][:-1])))] \
+        if len(order) else order
+    best[first[heads]] = second[heads]
+    best_score[first[heads]] = scores[heads]
+    return best, best_score
+
+
+def _keep_best(candidates, scores, budget):
+    """Returns the candidates of the budget highest scores."""
+    if len(candidates) <= budget:
+        return candidates
+    return candidates[np.argsort(-scores, kind='stable')[:max(budget, 0)]]
+
+
+def cluster_blocks(netlist, max_cluster_area, min_clusters, rng):
+    """
+    One level of clustering. Blocks are matched by heavy-edge matching: every unmatched block proposes to its
+    unmatched neighbour of highest affinity per unit of combined area, mutual proposals are matched, and this
+    is repeated for a few rounds. Blocks left alone then join, first-choice, the pair of highest score among
+    their neighbours. Clusters stay under max_cluster_area, and only the best scored merges are made when
+    all of them would leave fewer than min_clusters. Everything is NumPy over the pairs of blocks.
+    Returns the cluster index of every block and the number of clusters.
+    """
+    num_blocks = netlist.num_blocks
+    budget = num_blocks - min_clusters
+    area = netlist.width * netlist.height
+    first, second, affinity = block_affinity(netlist)
+    # Random tie-breaking, so that equal scores do not always favour low indices
+    scores = affinity / (area[first] + area[second]) * (1 + 1e-9 * rng.random(len(first)))
+
+    partner = np.full(num_blocks, -1)
+    best_score = np.zeros(num_blocks)
+    fits = area[first] + area[second] <= max_cluster_area
+    for _ in range(MATCHING_ROUNDS):
+        unmatched = partner < 0
+        proposal, proposal_score = _best_neighbours(first, second, scores,
+                                                    fits & unmatched[first] & unmatched[second], num_blocks)
+        proposers = np.flatnonzero(proposal >= 0)
+        mutual = proposers[proposal[proposal[proposers]] == proposers]
+        if not len(mutual):
+            break
+        partner[mutual] = proposal[mutual]
+        best_score[mutual] = proposal_score[mutual]
+
+    # Every pair is one merge, counted at its lower block
+    lower = np.flatnonzero((partner >= 0) & (partner > np.arange(num_blocks)))
+    kept = _keep_best(lower, best_score[lower], budget)
+    paired = np.zeros(num_blocks, dtype=bool)
+    paired[kept] = paired[partner[kept]] = True
+
+    # Pairs become clusters, numbered by their lower block; singles get their own cluster for now
+    root = np.arange(num_blocks)
+    root[partner[kept]] = kept
+    cluster_area = np.bincount(root, weights=area, minlength=num_blocks)
+    joinable = ~paired[first] & paired[second] & (area[first] + cluster_area[root[second]] <= max_cluster_area)
+    choice, choice_score = _best_neighbours(first, second, scores, joinable, num_blocks)
+    joining = np.flatnonzero(choice >= 0)
+    joining = _keep_best(joining, choice_score[joining], budget - len(kept))
+    root[joining] = root[choice[joining]]
+
+    clusters, cluster_of_block = np.unique(root, return_inverse=True)
+    return cluster_of_block, len(clusters)
+
+
+def contract(netlist, cluster_of_block, num_clusters, prefix="cluster"):
+    """
+    Collapses a netlist onto clusters of its blocks. A cluster block takes the summed area of its members,
+    as a square, and their summed power, unknown only if all of theirs is. Nets keep one pin per cluster or
+    terminal, and nets left with a single pin vanish; nets that become identical are kept, so that their
+    number still weighs the connection. A cluster of one block keeps the block's name and the others are named
+    <prefix><i>.
+    """
+    area = np.bincount(cluster_of_block, weights=netlist.width * netlist.height, minlength=num_clusters)
+    side = np.sqrt(area)
+    power = np.bincount(cluster_of_block, weights=np.nan_to_num(netlist.power), minlength=num_clusters)
+    known = np.bincount(cluster_of_block, weights=~np.isnan(netlist.power), minlength=num_clusters) > 0
+    power = np.where(known, power, np.nan)
+
+    sizes = np.bincount(cluster_of_block, minlength=num_clusters)
+    member = np.empty(num_clusters, dtype=np.int64)
+    member[cluster_of_block] = np.arange(netlist.num_blocks)
+    block_names = netlist.block_names
+    names = [block_names[member[i]] if sizes[i] == 1 else f"{prefix}{i}" for i in range(num_clusters)]
+
+    # Terminals follow the clusters, in their original order
+    node_map = np.concatenate((cluster_of_block, num_clusters + np.arange(netlist.num_nodes - netlist.num_blocks)))
+    pins = node_map[netlist.net_pins]
+    net_of_pin = np.repeat(np.arange(netlist.num_nets), netlist.net_degrees)
+    order = np.lexsort((pins, net_of_pin))
+    repeated = np.zeros(len(pins), dtype=bool)
+    repeated[order[1:]] = (pins[order[1:]] == pins[order[:-1]]) & (net_of_pin[order[1:]] == net_of_pin[order[:-1]])
+    pins, net_of_pin = pins[~repeated], net_of_pin[~repeated]
+
+    degrees = np.bincount(net_of_pin, minlength=netlist.num_nets)
+    kept_pins = degrees[net_of_pin] > 1
+    kept_nets = np.flatnonzero(degrees > 1)
+    offsets = np.concatenate(([0], np.cumsum(degrees[kept_nets])))
+    net_names = [netlist.net_names[i] for i in kept_nets.tolist()]
+    return Netlist(names + list(netlist.names[netlist.num_blocks:]), num_clusters, side, side, power,
+                   net_names, offsets, pins[kept_pins])
+
+
+def coarsen(netlist, ratios, seed=0, max_cluster_fraction=None):
+    """
+    Coarsens a netlist level by level until its number of blocks falls to each of the given ratios of the
+    original, and returns the (ratio, netlist, cluster_of_block) of every ratio reached, cluster_of_block
+    mapping every original block to its block of that netlist. Clusters of a level are capped at
+    max_cluster_fraction of the total area, by default four times the average block area of the smallest ratio,
+    so that the clusters of a proxy stay comparable in size. When a level no longer reduces the number of blocks
+    by 5%, the cap is doubled, and coarsening stops once even an uncapped level cannot.
+    """
+    rng = np.random.default_rng(seed)
+    ratios = sorted(ratios, reverse=True)
+    total_area = float(np.sum(netlist.width * netlist.height))
+    if max_cluster_fraction is None:
+        max_cluster_fraction = 4 / max(1, ratios[-1] * netlist.num_blocks)
+
+    levels = []
+    current, mapping, depth = netlist, np.arange(netlist.num_blocks), 0
+    for ratio in ratios:
+        target = int(np.ceil(ratio * netlist.num_blocks))
+        while current.num_blocks > target:
+            cluster_of_block, num_clusters = cluster_blocks(current, max_cluster_fraction * total_area,
+                                                            target, rng)
+            if num_clusters > max(target, 0.95 * current.num_blocks):
+                # Blocks too large to merge under the cap: relax it before giving up
+                if max_cluster_fraction >= 1:
+                    break
+                max_cluster_fraction = min(1, 2 * max_cluster_fraction)
+                continue
+            # The level in the names keeps the clusters of different levels apart
+            depth += 1
+            current = contract(current, cluster_of_block, num_clusters, f"cluster{depth}_")
+            mapping = cluster_of_block[mapping]
+        if current.num_blocks > target:
+            print(f"Coarsening stalled at {current.num_blocks} blocks, above the ratio {ratio:g}")
+            break
+        levels.append((ratio, current, mapping))
+    return levels
+
+
+def write_clusters(path, netlist, coarse, cluster_of_block):
+    """Writes a '<cluster> <original block>...' line per block of a coarse netlist."""
+    members = [[] for _ in range(coarse.num_blocks)]
+    for name, cluster in zip(netlist.block_names, cluster_of_block.tolist()):
+        members[cluster].append(name)
+    with open(path, 'w') as file:
+        file.writelines(f"{name} {' '.join(names)}\n" for name, names in zip(coarse.block_names, members))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Write coarse proxies of refined netlists.")
+    parser.add_argument("netlists", type=str, nargs="+", help="Refined netlist files.")
+    parser.add_argument("output_dir", type=str, help="Directory for the coarse netlists.")
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.5, 0.25, 0.1],
+                        help="Fractions of the original number of blocks to write proxies at "
+                             "(default: 0.5 0.25 0.1).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the tie-breaking (default: 0).")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for path in args.netlists:
+        netlist = Netlist.read_refined(path)
+        start = time.perf_counter()
+        levels = coarsen(netlist, args.ratios, args.seed)
+        elapsed = time.perf_counter() - start
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for ratio, coarse, cluster_of_block in levels:
+            output = os.path.join(args.output_dir, f"{stem}_coarse_{ratio:g}")
+            coarse.write_refined(output + ".txt")
+            write_clusters(output + ".clusters", netlist, coarse, cluster_of_block)
+        sizes = "".join(f" -> {coarse.num_blocks}" for _, coarse, _ in levels)
+        print(f"{path}: {netlist.num_blocks}{sizes} blocks ({elapsed:.2f} s)")
@@ -1,17 +1,188 @@
 import os
 import shutil
-import sys
 
-def remove_duplicates(source_dir, target_dir):
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows has no reflinks through fcntl; hardlinks and copies still work
+    fcntl = None
+
+import instrumentation
+from netlist import Netlist
+
+# Prime modulus of the MinHash permutations; below 2**32 so that a * x + b fits in 64 bits
+_PRIME = np.uint64(4294967291)
+# Tags that keep block shingles apart from net degree shingles
+_BLOCK_TAG = np.uint64(0x5bd1e995)
+_DEGREE_TAG = np.uint64(0x1b873593)
+# Weight of the block dimension similarity in the combined similarity; the net degree similarity makes up the rest.
+# Formats model nets differently (a YAL network statement per block, a Bookshelf net per signal), so the
+# degrees of the same design often share nothing, and blocks alone reaching the threshold also make a duplicate
+BLOCK_WEIGHT = 0.75
+# ioctl that clones a file's extents on Linux file systems with reflink support (Btrfs, XFS)
+_FICLONE = 0x40049409
+
+
+def _mix(values):
+    """SplitMix64 finalizer: scrambles uint64 values into well distributed hashes."""
+    values = values.astype(np.uint64)
+    with np.errstate(over='ignore'):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return values ^ (values >> np.uint64(31))
+
+
+def _with_occurrence(keys):
+    """Turns a multiset of keys into a set by numbering repeated keys: the k-th copy of a key hashes apart."""
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    occurrence = np.arange(len(keys)) - np.repeat(starts, np.diff(np.append(starts, len(keys))))
+    with np.errstate(over='ignore'):
+        return _mix(sorted_keys + _mix(occurrence.astype(np.uint64)))
+
+
+def shingles(netlist):
+    """
+    Returns the structural shingles of a netlist as two arrays of uint64 hashes: the block shingles, one per
+    block from its dimensions rounded to 0.01 and ordered so that rotated blocks match, and the degree
+    shingles, one per net from its degree. Names and the order of blocks and nets play no part.
+    """
+    width = np.round(netlist.width * 100).astype(np.int64)
+    height = np.round(netlist.height * 100).astype(np.int64)
+    shorter = np.minimum(width, height).astype(np.uint64)
+    longer = np.maximum(width, height).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        blocks = _mix(_mix(shorter ^ _BLOCK_TAG) + longer)
+        degrees = _mix(netlist.net_degrees.astype(np.uint64) ^ _DEGREE_TAG)
+    return _with_occurrence(blocks), _with_occurrence(degrees)
+
+
+class MinHasher:
+    """MinHash signatures under num_perm random linear permutations of the shingle hashes."""
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_hashes):
+        signature = np.full(len(self.a), _PRIME, dtype=np.uint64)
+        # Chunks bound the (shingles x permutations) matrix for netlists with millions of blocks
+        for start in range(0, len(shingle_hashes), 1 << 14):
+            values = (shingle_hashes[start:start + (1 << 14)] % _PRIME)[:, None]
+            signature = np.minimum(signature, ((values * self.a + self.b) % _PRIME).min(axis=0))
+        return signature
+
+    def fingerprint(self, netlist):
+        """The signature of a netlist's block shingles followed by that of its degree shingles."""
+        blocks, degrees = shingles(netlist)
+        return np.concatenate((self.signature(blocks), self.signature(degrees)))
+
+
+def similarity(first, second):
+    """
+    Estimated similarity of two fingerprints: the block similarity, or the weighted mean of the block
+    and degree similarities when that is higher. Each half estimates the Jaccard similarity of its shingles;
+    two empty sets (netlists without nets) agree everywhere and count as identical.
+    """
+    num_perm = len(first) // 2
+    blocks = np.mean(first[:num_perm] == second[:num_perm])
+    degrees = np.mean(first[num_perm:] == second[num_perm:])
+    return max(blocks, BLOCK_WEIGHT * blocks + (1 - BLOCK_WEIGHT) * degrees)
+
+
+def lsh_parameters(num_perm, threshold):
     """
-    Removes duplicate files based on their base names.
-    If the name starts with 'Corblivar', 'SMU', or 'UM', the part before the first '_' is ignored,
-    and duplicates are detected using the part of the name between the first '_' and the second '_'
-    or the first '.'.
+    Returns the (bands, rows) split of a signature whose LSH threshold (1 / bands) ** (1 / rows)
+    is closest to the requested Jaccard similarity.
+    """
+    splits = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(splits, key=lambda split: abs((1 / split[0]) ** (1 / split[1]) - threshold))
+
+
+def find_duplicate_groups(signatures, threshold=0.8):
+    """
+    Groups near-duplicate fingerprints. Candidates share an LSH bucket of their block signatures in at least
+    one band and are kept when their similarity reaches the threshold, so the cost grows with the number
+    of files and candidates rather than with all pairs. Returns the groups as lists of indices.
+    """
+    if not signatures:
+        return []
+    num_perm = len(signatures[0]) // 2
+    # Buckets are over the block signatures: a combined similarity reaches the threshold only if the block
+    # similarity reaches (threshold - (1 - BLOCK_WEIGHT)) / BLOCK_WEIGHT
+    bands, rows = lsh_parameters(num_perm, max(0.0, (threshold - 1 + BLOCK_WEIGHT) / BLOCK_WEIGHT))
+
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets = {}
+        for i, signature in enumerate(signatures):
+            buckets.setdefault(signature[band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            for other in members[1:]:
+                first, root = find(members[0]), find(other)
+                if first != root and similarity(signatures[members[0]], signatures[other]) >= threshold:
+                    parent[max(first, root)] = min(first, root)
+
+    groups = {}
+    for i in range(len(signatures)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def materialize(source, target, mode='auto'):
+    """
+    Places a copy of source at target without duplicating its bytes where possible.
+    'auto' tries a reflink (copy-on-write clone), then a hardlink, then falls back to a byte copy.
+    Returns the method used.
+    """
+    if os.path.lexists(target):
+        os.remove(target)
+    if mode in ('auto', 'reflink') and fcntl is not None:
+        try:
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            shutil.copystat(source, target)
+            return 'reflink'
+        except OSError:
+            os.remove(target)
+            if mode == 'reflink':
+                raise
+    if mode in ('auto', 'hardlink'):
+        try:
+            os.link(source, target)
+            return 'hardlink'
+        except OSError:
+            if mode == 'hardlink':
+                raise
+    shutil.copy2(source, target)
+    return 'copy'
+
+
+def remove_duplicates(source_dir, target_dir, threshold=0.8, num_perm=128, mode='auto'):
+    """
+    Removes duplicate netlists based on their content.
+    Every refined netlist (.txt file) gets MinHash signatures of its block dimension multiset and net degree
+    signature, and netlists whose estimated similarity reaches the threshold are duplicates, whatever their
+    names. The first file of each group, in sorted path order, is kept. Files that cannot be parsed are
+    reported and left out. Netlists (.txt files) left in target_dir by earlier runs that are not kept by this
+    one are deleted, so that target_dir holds exactly this run's survivors.
 
     Args:
         source_dir (str): The directory to scan for files.
         target_dir (str): The directory to save unique files.
+        threshold (float): Estimated similarity from which two netlists are duplicates (see similarity()).
+        num_perm (int): Number of MinHash permutations.
+        mode (str): How unique files are placed in target_dir: 'auto', 'reflink', 'hardlink' or 'copy'.
     """
     if not os.path.exists(source_dir):
         print(f"Source directory does not exist: {source_dir}")
@@ -20,38 +191,63 @@ def remove_duplicates(source_dir, target_dir):
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
 
-    # Dictionary to track unique base names
-    unique_files = {}
-
-    # Walk through the source directory
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            # Extract the relevant part of the name for duplicate detection
-            file_name = os.path.basename(file)
-            if file_name.startswith(("Corblivar_", "SMU_", "UM_")):
-                # Ignore the prefix (before the first '_') and extract the part between the first '_' and second '_' or '.'
-                remaining_part = file_name.split('_', 1)[1]
-                base_name = remaining_part.split('_')[0].split('.')[0]
-            else:
-                # Use the part before the first '.' or '_'
-                base_name = file_name.split('.')[0].split('_')[0]
-
-            if base_name not in unique_files:
-                unique_files[base_name] = os.path.join(root, file)
-    
-    # Copy unique files to the target directory
-    for base_name, file_path in unique_files.items():
-        shutil.copy(file_path, os.path.join(target_dir, os.path.basename(file_path)))
-
-    print(f"Unique files copied to {target_dir}")
+    file_paths = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        file_paths.extend(os.path.join(root, file) for file in sorted(files) if file.endswith('.txt'))
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python remove_duplicates.py <source_dir> <target_dir>")
-        sys.exit(1)
+    hasher = MinHasher(num_perm)
+    signatures = []
+    with instrumentation.span('signatures'):
+        for path in list(file_paths):
+            try:
+                signatures.append(hasher.fingerprint(Netlist.read_refined(path)))
+            except Exception as e:
+                print(f"Skipping {path}: not a refined netlist ({type(e).__name__}: {e})")
+                file_paths.remove(path)
+    with instrumentation.span('find_duplicate_groups'):
+        groups = find_duplicate_groups(signatures, threshold)
 
-    source_directory = sys.argv[1]
-    target_directory = sys.argv[2]
+    methods = {}
+    survivors = set()
+    with instrumentation.span('materialize'):
+        for group in groups:
+            kept = file_paths[group[0]]
+            for duplicate in group[1:]:
+                print(f"Duplicate: {file_paths[duplicate]} (keeping {kept})")
+            survivors.add(os.path.basename(kept))
+            method = materialize(kept, os.path.join(target_dir, os.path.basename(kept)), mode)
+            methods[method] = methods.get(method, 0) + 1
+        instrumentation.count('files_written', len(groups))
+
+    # Survivors of earlier runs that are duplicates now, or whose source is gone
+    for name in sorted(os.listdir(target_dir)):
+        path = os.path.join(target_dir, name)
+        if name.endswith('.txt') and name not in survivors and os.path.isfile(path):
+            os.remove(path)
+            print(f"Removed orphaned {path}")
+
+    summary = ", ".join(f"{count} by {method}" for method, count in sorted(methods.items()))
+    print(f"Unique files placed in {target_dir}: {summary}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Remove duplicate netlists based on their content.")
+    parser.add_argument("source_dir", type=str, help="The directory to scan for files.")
+    parser.add_argument("target_dir", type=str, help="The directory to save unique files.")
+    parser.add_argument("--threshold", type=float, default=0.8,
+                        help="Estimated similarity from which two netlists are duplicates (default: 0.8).")
+    parser.add_argument("--num-perm", type=int, default=128, help="Number of MinHash permutations (default: 128).")
+    parser.add_argument("--link", choices=["auto", "reflink", "hardlink", "copy"], default="auto",
+                        help="How unique files are placed in the target directory (default: reflink, "
+                             "else hardlink, else copy).")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.report:
+        instrumentation.enable(args.trace_memory)
 
     # Remove duplicates
-    remove_duplicates(source_directory, target_directory)
+    remove_duplicates(args.source_dir, args.target_dir, args.threshold, args.num_perm, args.link)
+    if args.report:
+        instrumentation.write_report(args.report, script='remove_duplicates')
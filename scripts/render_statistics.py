@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Histograms and box plots rendered from a statistics artifact: (kind, column, file name, options)
+PLOTS = [
+    ("histogram", "Width", "width_histogram.png", {}),
+    ("histogram", "Height", "height_histogram.png", {}),
+    ("histogram", "Aspect Ratio", "aspect ratio_histogram.png", {}),
+    ("histogram", "Power", "power_histogram.png", {}),
+    ("box", "Connection Counts", "connection_counts_whisker_plot.png",
+     {"vert": False, "title": "Whisker Plot of Connection Counts", "xlabel": "Number of Connections"}),
+    ("box", "Connection Counts", "connections_per_connection_box_plot.png",
+     {"vert": True, "title": "Box Plot of Average Connections", "ylabel": "Number of Connections"}),
+]
+
+
+def render_plot(kind, column, column_stats, output_path, options):
+    """
+    Renders one plot of a statistics artifact column to output_path.
+    matplotlib is only imported here, so the statistics run itself never loads it.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure()
+    if kind == "histogram":
+        edges = column_stats["histogram"]["edges"]
+        plt.hist(edges[:-1], bins=edges, weights=column_stats["histogram"]["counts"],
+                 alpha=0.7, color='blue', edgecolor='black')
+        plt.title(f"Histogram of {column}")
+        plt.xlabel(column)
+        plt.ylabel("Frequency")
+    else:
+        plt.gca().bxp([column_stats["box"]], vert=options["vert"], patch_artist=True, showmeans=False)
+        plt.title(options["title"])
+        if "xlabel" in options:
+            plt.xlabel(options["xlabel"])
+        if "ylabel" in options:
+            plt.ylabel(options["ylabel"])
+    plt.grid(True)
+    plt.savefig(output_path)
+    plt.close()
+    return output_path
+
+
+def render_all(artifact, output_dir, workers=1):
+    """
+    Renders every plot of a statistics artifact into output_dir, over a process pool if workers != 1.
+    Columns without values are skipped. Returns the paths written.
+    """
+    jobs = []
+    for kind, column, file_name, options in PLOTS:
+        column_stats = artifact["columns"][column]
+        if kind == "box" and not column_stats["count"]:
+            continue
+        jobs.append((kind, column, column_stats, os.path.join(output_dir, file_name), options))
+
+    if workers == 1 or len(jobs) <= 1:
+        return [render_plot(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(jobs))) as executor:
+        return list(executor.map(render_plot, *zip(*jobs)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python render_statistics.py <statistics.json> <output_directory> [workers]")
+        sys.exit(1)
+
+    with open(sys.argv[1], 'r') as f:
+        artifact = json.load(f)
+    os.makedirs(sys.argv[2], exist_ok=True)
+    for path in render_all(artifact, sys.argv[2], int(sys.argv[3]) if len(sys.argv) == 4 else 1):
+        print(f"Rendered {path}")
@@ -0,0 +1,279 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+_extraction_dir = os.path.join(_script_dir, 'data_extraction_scripts')
+_collection_dir = os.path.join(_script_dir, 'data_collection_scripts')
+sys.path.append(_extraction_dir)
+from extract_all_netlists import COMMON_SOURCES, EXTRACTORS, file_state
+
+ROOT = os.path.normpath(os.path.join(_script_dir, os.pardir))
+RAW_DIR = os.path.join(ROOT, 'raw data')
+WITH_DUPLICATES_DIR = os.path.join(ROOT, 'refined data', 'extracted data with duplicates')
+WITHOUT_DUPLICATES_DIR = os.path.join(ROOT, 'refined data', 'extracted data without duplicates')
+STATISTICS_DIR = os.path.join(ROOT, 'statistics of refined data')
+AUGMENTED_DIR = os.path.join(ROOT, 'augmented data')
+
+# A step of the pipeline: the command it runs, the files and folders it reads and those it writes.
+# Inputs include the sources of the code, so that a parser change reruns its stage; reports tells whether
+# the command takes the --report option of instrumentation.py, and pooled whether it takes a --workers process
+# pool size, given when the stage starts so that the stages running at once share the cores.
+Stage = namedtuple('Stage', ['name', 'command', 'inputs', 'outputs', 'reports', 'pooled'])
+
+# GitHub sources that download scripts fetch, with their raw data subfolder
+DOWNLOADS = {
+    'Corblivar': 'download_files_corblivar.py',
+    'HotSpot': 'download_files_hotspot.py',
+    'DeepMind': 'download_files_deepmind.py',
+}
+
+
+def _script(*parts):
+    return os.path.join(_script_dir, *parts)
+
+
+def build_stages(download=False, augment_files=50, seed=0, plots=True):
+    """
+    Returns the stages of the corpus build: the downloads of the GitHub sources (only with download), one
+    extraction per source format, deduplication, statistics and augmentation.
+    """
+    python = sys.executable
+    stages = []
+    if download:
+        for source, script in DOWNLOADS.items():
+            stages.append(Stage(f'download_{source}', [python, os.path.join(_collection_dir, script),
+                                                       os.path.join(RAW_DIR, source)],
+                                [], [os.path.join(RAW_DIR, source)], False, False))
+
+    for format_name, (module_name, raw_subdir, output_subdir, shared_sources) in EXTRACTORS.items():
+        sources = [os.path.normpath(os.path.join(_extraction_dir, source))
+                   for source in (module_name + '.py', 'extract_all_netlists.py') + tuple(shared_sources)
+                   + COMMON_SOURCES]
+        # Every format keeps its own manifest, so that concurrent extractions never write the same file
+        manifest = os.path.join(ROOT, '.pipeline', 'manifests', f'{format_name}.json')
+        stages.append(Stage(f'extract_{format_name}',
+                            [python, os.path.join(_extraction_dir, 'extract_all_netlists.py'), RAW_DIR,
+                             WITH_DUPLICATES_DIR, '--formats', format_name, '--manifest', manifest],
+                            [os.path.join(RAW_DIR, raw_subdir)] + sources,
+                            [os.path.join(WITH_DUPLICATES_DIR, output_subdir)], True, True))
+
+    # remove_duplicates deletes the netlists that earlier runs left in its output folder and this run does not
+    # keep, so the folder holds this run's survivors only
+    stages.append(Stage('remove_duplicates',
+                        [python, _script('remove_duplicates.py'), WITH_DUPLICATES_DIR, WITHOUT_DUPLICATES_DIR],
+                        [WITH_DUPLICATES_DIR] + [_script(name) for name in (
+                            'remove_duplicates.py', 'netlist.py', 'instrumentation.py')],
+                        [WITHOUT_DUPLICATES_DIR], True, False))
+    stages.append(Stage('statistics',
+                        [python, _script('generate_statistics_extracted_data.py'), WITHOUT_DUPLICATES_DIR,
+                         STATISTICS_DIR] + ([] if plots else ['--no-plots']),
+                        [WITHOUT_DUPLICATES_DIR] + [_script(name) for name in (
+                            'generate_statistics_extracted_data.py', 'streaming_statistics.py', 'distributions.py',
+                            'render_statistics.py', 'netlist.py', 'netlist_cache.py', 'instrumentation.py')],
+                        [STATISTICS_DIR], True, False))
+    stages.append(Stage('augmentation',
+                        [python, _script('data_augmentation.py'), AUGMENTED_DIR, '--num-files', str(augment_files),
+                         '--seed', str(seed)],
+                        [os.path.join(STATISTICS_DIR, 'distributions.json')] + [_script(name) for name in (
+                            'data_augmentation.py', 'distributions.py', 'netlist.py', 'instrumentation.py')],
+                        [AUGMENTED_DIR], True, False))
+    return stages
+
+
+def _overlaps(first, second):
+    """Tells whether two paths are the same or one lies inside the other."""
+    return os.path.commonpath([first, second]) in (first, second)
+
+
+def dependencies(stages):
+    """Returns the names of the stages each stage waits for: those writing anything it reads."""
+    return {stage.name: {other.name for other in stages if other is not stage and
+                         any(_overlaps(path, output) for path in stage.inputs for output in other.outputs)}
+            for stage in stages}
+
+
+def _input_files(paths):
+    """Lists the files of input paths, walking folders in a stable order and leaving out hidden entries."""
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(name for name in dirs if not name.startswith('.') and name != '__pycache__')
+            files.extend(os.path.join(root, name) for name in sorted(names) if not name.startswith('.'))
+    return files
+
+
+def fingerprint(stage, file_states):
+    """
+    Returns a hash of a stage's command and the content of every input file, or None for a stage without inputs
+    (a download), which can never be known to be up to date. Contents are hashed through file_states,
+    keyed by path relative to the repository, whose hashes are reused while a file's size and mtime hold.
+    """
+    if not stage.inputs:
+        return None
+    digest = hashlib.sha256(json.dumps([os.path.relpath(part, ROOT) if os.path.isabs(part) else part
+                                        for part in stage.command[1:]]).encode())
+    for path in _input_files(stage.inputs):
+        relative = os.path.relpath(path, ROOT)
+        file_states[relative] = file_state(path, file_states.get(relative))
+        digest.update(f"{relative}\0{file_states[relative]['sha256']}\n".encode())
+    return digest.hexdigest()
+
+
+def is_up_to_date(stage, previous, stage_fingerprint):
+    """Tells whether a stage's last run succeeded on the same inputs and its outputs are still there."""
+    return (stage_fingerprint is not None and previous is not None and previous['status'] == 'ok'
+            and previous['fingerprint'] == stage_fingerprint and all(os.path.exists(path) for path in stage.outputs))
+
+
+class PipelineState:
+    """
+    The state file of the runner: the fingerprint and outcome of the last run of every stage and the hashes
+    of the input files. It is rewritten after every stage, so a run that fails or is interrupted resumes
+    from the stages it did not finish.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stages, self.files = {}, {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            self.stages, self.files = state['stages'], state['files']
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'stages': self.stages, 'files': self.files}, f, indent=2)
+        os.replace(temporary, self.path)
+
+
+def run_stage(stage, log_path, report_path=None, workers=None):
+    """Runs a stage's command with its output in a log file. Returns whether it succeeded and its duration."""
+    command = list(stage.command) + (['--report', report_path] if report_path and stage.reports else [])
+    if workers and stage.pooled:
+        command += ['--workers', str(workers)]
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        returncode = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT, cwd=os.path.dirname(command[1]))
+    return returncode == 0, time.perf_counter() - start
+
+
+def run_pipeline(stages, state_dir, jobs=None, force=(), dry_run=False, reports=False):
+    """
+    Runs the stages in dependency order, up to jobs at a time, skipping those whose inputs did not change since
+    their last successful run. A stage runs once every stage it depends on has finished or was skipped;
+    stages after a failure are not run. force is a collection of stage names to run regardless, or True for all.
+    Pooled stages get an equal share of the cores among the pooled stages running or starting with them, so
+    that a single stale extraction uses every core and six concurrent ones do not oversubscribe them.
+    Returns the outcome of every stage: 'skipped', 'ok', 'failed' or 'blocked' (or 'stale' in a dry run).
+    """
+    state = PipelineState(os.path.join(state_dir, 'state.json'))
+    log_dir = os.path.join(state_dir, 'logs')
+    report_dir = os.path.join(state_dir, 'reports')
+    for directory in (log_dir, report_dir) if not dry_run else ():
+        os.makedirs(directory, exist_ok=True)
+    waits_for = dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    outcomes = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        while len(outcomes) < len(stages):
+            starting = []
+            for stage in stages:
+                if stage.name in outcomes or stage.name in running.values() or \
+                        any(name not in outcomes for name in waits_for[stage.name]):
+                    continue
+                upstream = [outcomes[name] for name in waits_for[stage.name]]
+                if any(outcome in ('failed', 'blocked') for outcome in upstream):
+                    outcomes[stage.name] = 'blocked'
+                    print(f"[{stage.name}] not run: an upstream stage failed")
+                    continue
+                if dry_run:
+                    changed = 'stale' in upstream or force is True or stage.name in force or \
+                        not is_up_to_date(stage, state.stages.get(stage.name), fingerprint(stage, state.files))
+                    outcomes[stage.name] = 'stale' if changed else 'skipped'
+                    print(f"[{stage.name}] {'would run' if changed else 'up to date'}")
+                    continue
+                stage_fingerprint = fingerprint(stage, state.files)
+                if force is not True and stage.name not in force and \
+                        is_up_to_date(stage, state.stages.get(stage.name), stage_fingerprint):
+                    outcomes[stage.name] = 'skipped'
+                    print(f"[{stage.name}] up to date")
+                    continue
+                starting.append((stage, stage_fingerprint))
+
+            pooled = (sum(stage.pooled for stage, _ in starting)
+                      + sum(by_name[name].pooled for name in running.values()))
+            for stage, stage_fingerprint in starting:
+                print(f"[{stage.name}] running")
+                future = executor.submit(run_stage, stage, os.path.join(log_dir, stage.name + '.log'),
+                                         os.path.join(report_dir, stage.name + '.json') if reports else None,
+                                         max(1, os.cpu_count() // pooled) if stage.pooled else None)
+                running[future] = stage.name
+                state.stages[stage.name] = {'fingerprint': stage_fingerprint, 'status': 'running'}
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                succeeded, seconds = future.result()
+                outcomes[name] = 'ok' if succeeded else 'failed'
+                state.stages[name].update(status=outcomes[name], seconds=round(seconds, 3), finished=time.time())
+                state.save()
+                log_path = os.path.join(log_dir, name + '.log')
+                if succeeded:
+                    print(f"[{name}] done in {seconds:.2f}s")
+                else:
+                    print(f"[{name}] FAILED after {seconds:.2f}s, see {log_path}")
+    if not dry_run:
+        state.save()
+    return outcomes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the corpus: extraction, deduplication, statistics and "
+                                                 "augmentation, rerunning only the stages whose inputs changed.")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Number of stages run at once (default: the number of cores).")
+    parser.add_argument("--download", action="store_true",
+                        help="Also refresh the raw data of the GitHub sources before extracting it.")
+    parser.add_argument("--force", nargs="*", default=None, metavar="STAGE",
+                        help="Rerun the given stages, or every stage when none is named, even if up to date.")
+    parser.add_argument("--dry-run", action="store_true", help="Only tell which stages would run.")
+    parser.add_argument("--augment-files", type=int, default=50,
+                        help="Number of netlists the augmentation generates (default: 50).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the augmentation (default: 0).")
+    parser.add_argument("--no-plots", action="store_true", help="Skip the figures of the statistics stage.")
+    parser.add_argument("--reports", action="store_true",
+                        help="Have every stage write an instrumentation report to <state dir>/reports.")
+    parser.add_argument("--state-dir", type=str, default=os.path.join(ROOT, '.pipeline'),
+                        help="Directory of the state file, logs and reports (default: .pipeline in the repository).")
+    args = parser.parse_args()
+
+    stages = build_stages(args.download, args.augment_files, args.seed, plots=not args.no_plots)
+    names = [stage.name for stage in stages]
+    force = () if args.force is None else (args.force or True)
+    if force is not True and set(force) - set(names):
+        parser.error(f"unknown stages {sorted(set(force) - set(names))}; stages are {', '.join(names)}")
+
+    start = time.perf_counter()
+    outcomes = run_pipeline(stages, args.state_dir, args.jobs, force, args.dry_run, args.reports)
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    print(f"{', '.join(f'{count} {outcome}' for outcome, count in sorted(counts.items()))} "
+          f"in {time.perf_counter() - start:.2f}s")
+    sys.exit(1 if counts.get('failed') or counts.get('blocked') else 0)
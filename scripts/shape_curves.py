@@ -0,0 +1,42 @@
+import numpy as np
+
+# Number of candidate shapes per block in a discrete shape function
+DEFAULT_NUM_SHAPES = 9
+
+
+def aspect_bounds(min_aspect, max_aspect, rotatable=False):
+    """
+    Returns the lowest and highest aspect ratio (height / width) every block may take.
+    Rotatable blocks may also take the reciprocal of their aspect ratio limits.
+    """
+    low = np.asarray(min_aspect, dtype=np.float64)
+    high = np.asarray(max_aspect, dtype=np.float64)
+    rotatable = np.asarray(rotatable, dtype=bool)
+    return np.where(rotatable, np.minimum(low, 1 / high), low), np.where(rotatable, np.maximum(high, 1 / low), high)
+
+
+def shape_functions(area, min_aspect, max_aspect, rotatable=False, num_shapes=DEFAULT_NUM_SHAPES):
+    """
+    Computes the discrete shape functions of soft blocks, all at once: num_shapes candidate shapes per block
+    whose aspect ratios are spaced geometrically from the lowest to the highest feasible one, so a block
+    and its rotation get mirrored candidates. Hard blocks (equal limits) get num_shapes copies of their shape.
+    Returns the widths and heights as (num_blocks, num_shapes) arrays, ordered by increasing aspect ratio.
+    """
+    area = np.asarray(area, dtype=np.float64)[:, None]
+    low, high = aspect_bounds(min_aspect, max_aspect, rotatable)
+    steps = np.linspace(0, 1, num_shapes)
+    aspect = low[:, None] * (high / low)[:, None] ** steps
+    width = np.sqrt(area / aspect)
+    return width, area / width
+
+
+def squarest_shapes(area, min_aspect, max_aspect, rotatable=False):
+    """
+    Returns the width and height of the shape closest to a square that every block may take:
+    the aspect ratio 1 clamped into its feasible range.
+    """
+    area = np.asarray(area, dtype=np.float64)
+    low, high = aspect_bounds(min_aspect, max_aspect, rotatable)
+    width = np.sqrt(area / np.clip(1, low, high))
+    return width, area / width
+
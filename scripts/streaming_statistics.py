@@ -0,0 +1,237 @@
+import numpy as np
+
+# Ratio by which the capacity of a compactor shrinks with each level below the top one
+_CAPACITY_DECAY = 2 / 3
+
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch in the style of KLL (Karnin, Lang and Liberty).
+    Values are kept in levels of compactors; an item at level h stands for 2**h input values.
+    When a level outgrows its capacity it is sorted and every other item is promoted to the next level,
+    so memory stays O(k log(n / k)) however many values are added.
+    Until the first compaction the sketch holds every value and its quantiles are exact.
+    """
+
+    def __init__(self, k=2048, seed=0):
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        # Sum of 2**h over all compactions: a worst-case bound on the rank error of any query
+        self.rank_error = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * _CAPACITY_DECAY ** depth)))
+
+    def update(self, values):
+        """Adds an array of values; NaNs are ignored."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def merge(self, other):
+        """Folds another sketch into this one."""
+        if not other.count:
+            return
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.rank_error += other.rank_error
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so that only pairs are compacted
+                keep = items[:len(items) % 2]
+                pairs = items[len(keep):]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+                self.rank_error += 2 ** level
+            level += 1
+
+    @property
+    def num_retained(self):
+        return sum(len(items) for items in self.levels)
+
+    @property
+    def is_exact(self):
+        return self.rank_error == 0
+
+    def weighted_items(self):
+        """Returns the retained items in sorted order together with the number of values each stands for."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level, dtype=np.int64)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantile(self, q):
+        """
+        Returns the q-quantile with linear interpolation between the closest ranks,
+        which matches numpy and pandas while the sketch is exact.
+        """
+        if not self.count:
+            return np.nan
+        items, weights = self.weighted_items()
+        # Ranks covered by each item end at its cumulative weight
+        ends = np.cumsum(weights)
+        position = np.asarray(q, dtype=np.float64) * (ends[-1] - 1)
+        lower = items[np.searchsorted(ends, np.floor(position), side='right')]
+        upper = items[np.searchsorted(ends, np.ceil(position), side='right')]
+        return lower + (upper - lower) * (position - np.floor(position))
+
+    def error_bound(self):
+        """Worst-case rank error of a quantile as a fraction of the values added."""
+        return self.rank_error / self.count if self.count else 0.0
+
+
+class LogHistogram:
+    """
+    Histogram over fixed, logarithmically spaced bins, so histograms built on separate files
+    or processes merge by adding their counts. Values at or below the first edge, zero included,
+    fall in the first bin and values above the last edge in the last one.
+    """
+
+    def __init__(self, bins_per_decade=64, min_exponent=-9, max_exponent=12):
+        self.edges = 10.0 ** (np.arange(min_exponent * bins_per_decade, max_exponent * bins_per_decade + 1)
+                              / bins_per_decade)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+
+    def update(self, values):
+        bins = np.searchsorted(self.edges, values, side='left')
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def merge(self, other):
+        self.counts += other.counts
+
+    def centers(self):
+        """Returns the geometric mean of each bin's edges, and the outer edges for the two outer bins."""
+        inner = np.sqrt(self.edges[:-1] * self.edges[1:])
+        return np.concatenate(([self.edges[0]], inner, [self.edges[-1]]))
+
+    def rebin(self, bins, value_range):
+        """Re-bins the counts into evenly spaced bins over value_range, as numpy.histogram would."""
+        centers = np.clip(self.centers(), *value_range)
+        return np.histogram(centers, bins=bins, range=value_range, weights=self.counts)
+
+
+class ColumnSummary:
+    """
+    Running count, mean, min and max of a column together with a KLLSketch of its quantiles
+    and a LogHistogram. Summaries of separate files or processes merge into the summary of their union.
+    """
+
+    def __init__(self, k=2048):
+        self.total = 0.0
+        self.sketch = KLLSketch(k)
+        self.histogram = LogHistogram()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        self.total += float(values.sum())
+        self.sketch.update(values)
+        self.histogram.update(values)
+
+    def merge(self, other):
+        self.total += other.total
+        self.sketch.merge(other.sketch)
+        self.histogram.merge(other.histogram)
+
+    def histogram_counts(self, bins=20):
+        """
+        Returns the counts and edges of an evenly spaced histogram between the column's min and max:
+        exact while the sketch is, and re-binned from the LogHistogram otherwise.
+        """
+        if self.sketch.is_exact:
+            items, weights = self.sketch.weighted_items()
+            return np.histogram(items, bins=bins, weights=weights)
+        return self.histogram.rebin(bins, (self.sketch.min, self.sketch.max))
+
+    @property
+    def count(self):
+        return self.sketch.count
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def error_bound(self):
+        return self.sketch.error_bound()
+
+
+class JointLogHistogram:
+    """
+    Two-dimensional histogram over fixed, logarithmically spaced bins on both axes,
+    merged by adding counts. Values outside the edges fall in the outer bins.
+    """
+
+    def __init__(self, x_range=(-3, 6), y_range=(-3, 3), bins_per_decade=8):
+        self.x_edges = 10.0 ** (np.arange(x_range[0] * bins_per_decade, x_range[1] * bins_per_decade + 1)
+                                / bins_per_decade)
+        self.y_edges = 10.0 ** (np.arange(y_range[0] * bins_per_decade, y_range[1] * bins_per_decade + 1)
+                                / bins_per_decade)
+        self.counts = np.zeros((len(self.x_edges) + 1, len(self.y_edges) + 1), dtype=np.int64)
+
+    def update(self, x, y):
+        known = ~(np.isnan(x) | np.isnan(y))
+        rows = np.searchsorted(self.x_edges, x[known], side='left')
+        columns = np.searchsorted(self.y_edges, y[known], side='left')
+        np.add.at(self.counts, (rows, columns), 1)
+
+    def merge(self, other):
+        self.counts += other.counts
+
+
+class ConnectivitySummary:
+    """
+    Exact net degree counts together with the number of nets and of blocks
+    over the netlists that have connections.
+    """
+
+    def __init__(self):
+        self.degree_counts = np.zeros(0, dtype=np.int64)
+        self.num_nets = 0
+        self.num_blocks = 0
+
+    def _add_counts(self, counts):
+        if len(counts) > len(self.degree_counts):
+            self.degree_counts = np.concatenate(
+                (self.degree_counts, np.zeros(len(counts) - len(self.degree_counts), dtype=np.int64)))
+        self.degree_counts[:len(counts)] += counts
+
+    def update(self, net_degrees, num_blocks):
+        if not len(net_degrees):
+            return
+        self._add_counts(np.bincount(net_degrees))
+        self.num_nets += len(net_degrees)
+        self.num_blocks += num_blocks
+
+    def merge(self, other):
+        self._add_counts(other.degree_counts)
+        self.num_nets += other.num_nets
+        self.num_blocks += other.num_blocks
@@ -0,0 +1,149 @@
+import numpy as np
+
+# Placements rasterized at once, bounding the (placements x blocks x grid) coverage arrays
+_RASTER_CHUNK = 32
+
+# Refined netlists give dimensions in micrometers and power in watts; maps are in W/mm^2
+_DENSITY_TO_W_PER_MM2 = 1e6
+
+
+def coverage(start, length, num_cells, cell_size):
+    """
+    Returns how much of every grid cell along one axis each interval [start, start + length) covers,
+    as a fraction of the cell: a (..., num_cells) array. Intervals are clipped to the grid.
+    """
+    low = (start / cell_size)[..., None]
+    high = ((start + length) / cell_size)[..., None]
+    cells = np.arange(num_cells)
+    return np.clip(high, cells, cells + 1) - np.clip(low, cells, cells + 1)
+
+
+def power_density_maps(x, y, width, height, power, tiers=None, num_tiers=1, die=None, grid=64):
+    """
+    Rasterizes the power of blocks onto a grid x grid map of every tier, for a batch of placements.
+    x, y, width, height, power and tiers are (placements x blocks) arrays (or 1D for one placement), with x and y
+    the lower-left corners; unplaced blocks (NaN) and unknown power (NaN) contribute nothing.
+    die is the (width, height) of every die, by default the outline of all placements.
+
+    A block spreads its power uniformly over its area, so the power density of a cell is the sum over blocks of
+    their density times the fraction of the cell they cover. That coverage is the product of an x and a y
+    coverage, which makes every map a sum of outer products, computed as one batched matrix product per tier.
+    Returns (placements x tiers x grid x grid) maps in W/mm^2, indexed [y, x].
+    """
+    x, y = np.atleast_2d(x), np.atleast_2d(y)
+    width = np.broadcast_to(width, x.shape)
+    height = np.broadcast_to(height, x.shape)
+    tiers = np.zeros(x.shape, dtype=np.int64) if tiers is None else np.broadcast_to(tiers, x.shape)
+    if die is None:
+        die = (np.nanmax(x + width), np.nanmax(y + height))
+
+    placed = ~(np.isnan(x) | np.isnan(y))
+    density = np.where(placed, np.nan_to_num(np.broadcast_to(power, x.shape)) / (width * height), 0)
+    x, y = np.where(placed, x, 0), np.where(placed, y, 0)
+
+    maps = np.empty((len(x), num_tiers, grid, grid))
+    for start in range(0, len(x), _RASTER_CHUNK):
+        chunk = slice(start, start + _RASTER_CHUNK)
+        cover_x = coverage(x[chunk], width[chunk], grid, die[0] / grid)
+        cover_y = coverage(y[chunk], height[chunk], grid, die[1] / grid).transpose(0, 2, 1)
+        for tier in range(num_tiers):
+            weighted = cover_x * np.where(tiers[chunk] == tier, density[chunk], 0)[..., None]
+            maps[chunk, tier] = np.matmul(cover_y, weighted)
+    return maps * _DENSITY_TO_W_PER_MM2
+
+
+def gaussian_operator(grid, sigma):
+    """
+    Returns the grid x grid matrix that blurs a signal of grid cells with a Gaussian of sigma cells.
+    The die edges are adiabatic: heat is reflected back rather than lost, so every column sums to 1.
+    """
+    cells = np.arange(grid)
+    radius = max(1, int(np.ceil(4 * sigma)))
+    offsets = np.arange(-radius, radius + 1)
+    weights = np.exp(-0.5 * (offsets / sigma) ** 2)
+    weights /= weights.sum()
+    # Targets of every (source, offset) pair, reflected back into the grid at both edges
+    targets = cells[:, None] + offsets
+    targets = np.where(targets < 0, -1 - targets, targets)
+    targets = np.where(targets >= grid, 2 * grid - 1 - targets, targets)
+    operator = np.zeros((grid, grid))
+    np.add.at(operator, (targets.clip(0, grid - 1), np.broadcast_to(cells[:, None], targets.shape)),
+              np.broadcast_to(weights, targets.shape))
+    return operator
+
+
+def thermal_proxy(maps, sigma=2.0, vertical_coupling=0.5):
+    """
+    Turns power density maps into a thermal proxy: every tier is blurred by a separable Gaussian of sigma cells,
+    applied as one matrix product per axis, and tiers heat each other with a weight of vertical_coupling
+    per tier in between. Returns maps of the same shape as the input.
+    """
+    operator = gaussian_operator(maps.shape[-1], sigma)
+    blurred = operator @ maps @ operator.T
+    tiers = np.arange(maps.shape[1])
+    coupling = vertical_coupling ** np.abs(tiers[:, None] - tiers)
+    return np.einsum('st,ptij->psij', coupling, blurred)
+
+
+def hotspot_metrics(thermal, hotspot_ratio=0.9):
+    """
+    Summarizes thermal proxy maps of a batch of placements. Returns a dictionary of arrays over placements:
+    'peak' (the hottest cell of any tier), 'tier_peaks' (placements x tiers), 'mean', 'peak_to_mean',
+    'gradient' (the largest difference between neighbouring cells) and 'hotspot_fraction'
+    (the fraction of cells within hotspot_ratio of the peak).
+    """
+    num_placements = len(thermal)
+    flat = thermal.reshape(num_placements, -1)
+    peak = flat.max(axis=1)
+    mean = flat.mean(axis=1)
+    gradient = np.maximum(np.abs(np.diff(thermal, axis=-1)).reshape(num_placements, -1).max(axis=1),
+                          np.abs(np.diff(thermal, axis=-2)).reshape(num_placements, -1).max(axis=1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        peak_to_mean = np.where(mean > 0, peak / mean, 0)
+    return {
+        'peak': peak,
+        'tier_peaks': thermal.max(axis=(-2, -1)),
+        'mean': mean,
+        'peak_to_mean': peak_to_mean,
+        'gradient': gradient,
+        'hotspot_fraction': np.mean(flat >= hotspot_ratio * peak[:, None], axis=1),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from floorplan_evaluation import read_placements
+    from netlist import Netlist
+
+    parser = argparse.ArgumentParser(description="Compute thermal proxy metrics of placements of a refined netlist.")
+    parser.add_argument("netlist", type=str, help="Refined netlist file.")
+    parser.add_argument("placements", type=str, nargs="+", help="Bookshelf .pl placements of the netlist.")
+    parser.add_argument("--grid", type=int, default=64, help="Number of grid cells along each axis (default: 64).")
+    parser.add_argument("--sigma", type=float, default=2.0,
+                        help="Lateral heat spreading, in grid cells (default: 2).")
+    parser.add_argument("--die", type=float, nargs=2, metavar=("WIDTH", "HEIGHT"), default=None,
+                        help="Die dimensions (default: the outline of the placements).")
+    parser.add_argument("--tiers", type=str, default=None,
+                        help="Tier assignment of the blocks, as written by tier_partitioning.py (default: one tier).")
+    args = parser.parse_args()
+
+    netlist = Netlist.read_refined(args.netlist)
+    x, y, turned = read_placements(args.placements, netlist)
+    x, y = x[:, :netlist.num_blocks], y[:, :netlist.num_blocks]
+    width = np.where(turned, netlist.height, netlist.width)
+    height = np.where(turned, netlist.width, netlist.height)
+    tiers, num_tiers = None, 1
+    if args.tiers:
+        from tier_partitioning import read_tiers
+        tiers = read_tiers(args.tiers, netlist)
+        num_tiers = int(tiers.max(initial=0)) + 1
+    maps = power_density_maps(x, y, width, height, netlist.power, tiers, num_tiers, die=args.die, grid=args.grid)
+    metrics = hotspot_metrics(thermal_proxy(maps, args.sigma))
+    for i, path in enumerate(args.placements):
+        line = (f"{path}: peak power density {maps[i].max():g} W/mm^2, thermal proxy peak {metrics['peak'][i]:g}, "
+                f"peak/mean {metrics['peak_to_mean'][i]:.3g}, max gradient {metrics['gradient'][i]:g}, "
+                f"hotspot fraction {metrics['hotspot_fraction'][i]:.3g}")
+        if num_tiers > 1:
+            line += ", tier peaks " + " ".join(f"{peak:g}" for peak in metrics['tier_peaks'][i].tolist())
+        print(line)
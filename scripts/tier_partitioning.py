@@ -0,0 +1,321 @@
+import os
+
+import numpy as np
+
+from netlist import Netlist
+
+
+class Hypergraph:
+    """
+    Weighted hypergraph of the blocks of a netlist, as the partitioner sees it: vertices are blocks weighted by
+    their area, and hyperedges are the nets over at least two distinct blocks (terminals left out), with
+    nets over the same blocks merged into one edge weighted by their number. Both directions are kept as
+    Python lists in CSR form, net to vertices and vertex to nets, for the move loop of the partitioner.
+    """
+
+    def __init__(self, vertex_weights, net_vertices, net_weights):
+        self.vertex_weights = vertex_weights
+        self.net_weights = net_weights
+        self.net_offsets = [0]
+        self.net_pins = []
+        vertex_nets = [[] for _ in vertex_weights]
+        for net, vertices in enumerate(net_vertices):
+            self.net_pins.extend(vertices)
+            self.net_offsets.append(len(self.net_pins))
+            for vertex in vertices:
+                vertex_nets[vertex].append(net)
+        self.vertex_nets = vertex_nets
+
+    @property
+    def num_vertices(self):
+        return len(self.vertex_weights)
+
+    @property
+    def num_nets(self):
+        return len(self.net_weights)
+
+    def net(self, i):
+        return self.net_pins[self.net_offsets[i]:self.net_offsets[i + 1]]
+
+    @classmethod
+    def from_netlist(cls, netlist):
+        edges = {}
+        for i in range(netlist.num_nets):
+            pins = netlist.net(i)
+            vertices = tuple(sorted(set(pins[pins < netlist.num_blocks].tolist())))
+            if len(vertices) > 1:
+                edges[vertices] = edges.get(vertices, 0) + 1
+        return cls((netlist.width * netlist.height).tolist(), list(edges), list(edges.values()))
+
+    def subgraph(self, vertices):
+        """
+        Returns the hypergraph induced by a list of vertices, numbered in that order:
+        the nets keep their pins among these vertices and are dropped below two pins.
+        """
+        new_index = {vertex: i for i, vertex in enumerate(vertices)}
+        net_vertices, net_weights = [], []
+        for net in range(self.num_nets):
+            kept = [new_index[v] for v in self.net(net) if v in new_index]
+            if len(kept) > 1:
+                net_vertices.append(kept)
+                net_weights.append(self.net_weights[net])
+        return Hypergraph([self.vertex_weights[v] for v in vertices], net_vertices, net_weights)
+
+
+def _grow_initial_side(hypergraph, target, rng):
+    """
+    Initial bisection by graph growing: vertices reached breadth-first from a random seed go to side 0
+    until it holds the target weight, so side 0 starts as a connected region rather than a random set.
+    """
+    side = [1] * hypergraph.num_vertices
+    weight = 0.0
+    order = rng.permutation(hypergraph.num_vertices).tolist()
+    queue, head = [], 0
+    for seed in order:
+        if weight >= target:
+            break
+        if side[seed] == 0:
+            continue
+        side[seed] = 0
+        weight += hypergraph.vertex_weights[seed]
+        queue.append(seed)
+        while head < len(queue) and weight < target:
+            vertex = queue[head]
+            head += 1
+            for net in hypergraph.vertex_nets[vertex]:
+                for neighbour in hypergraph.net(net):
+                    if side[neighbour] == 1 and weight < target:
+                        side[neighbour] = 0
+                        weight += hypergraph.vertex_weights[neighbour]
+                        queue.append(neighbour)
+    return side
+
+
+def cut_weight(hypergraph, side):
+    """Total weight of the nets with pins on both sides."""
+    return sum(weight for net, weight in enumerate(hypergraph.net_weights)
+               if len({side[v] for v in hypergraph.net(net)}) > 1)
+
+
+def fm_pass(hypergraph, side, bounds, stall_limit):
+    """
+    One Fiduccia-Mattheyses pass: every vertex moves at most once, always the free vertex of highest gain whose
+    move keeps the weight of side 0 within bounds (or brings it closer to them), then the best prefix of the
+    moves is kept.
+    Gains live in one bucket list per side, an array of vertex sets indexed by gain with a pointer to the
+    highest non-empty bucket, and only the nets of a moved vertex that can still change gains are visited,
+    so a pass costs O(pins). The pass stops early after stall_limit moves without a new best cut.
+    Updates side in place and returns the reduction of the cut weight, negative when restoring the balance
+    cost more than the moves gained.
+    """
+    num_vertices = hypergraph.num_vertices
+    vertex_weights, vertex_nets = hypergraph.vertex_weights, hypergraph.vertex_nets
+    net_weights, net_offsets, net_pins = hypergraph.net_weights, hypergraph.net_offsets, hypergraph.net_pins
+
+    # Pins per side of every net, and initial gains, in NumPy
+    pins = np.array(net_pins, dtype=np.int64)
+    pin_nets = np.repeat(np.arange(hypergraph.num_nets), np.diff(net_offsets))
+    pin_sides = np.array(side, dtype=np.int64)[pins]
+    ones = np.bincount(pin_nets, weights=pin_sides, minlength=hypergraph.num_nets).astype(np.int64)
+    counts_array = np.stack((np.diff(net_offsets) - ones, ones))
+    from_counts = counts_array[pin_sides, pin_nets]
+    to_counts = counts_array[1 - pin_sides, pin_nets]
+    weights = np.array(net_weights, dtype=np.int64)[pin_nets]
+    gain = np.bincount(pins, weights=weights * ((from_counts == 1).astype(np.int64) - (to_counts == 0)),
+                       minlength=num_vertices).astype(np.int64).tolist()
+    counts = counts_array.tolist()
+
+    max_gain = max((sum(net_weights[net] for net in nets) for nets in vertex_nets), default=0)
+    buckets = [[set() for _ in range(2 * max_gain + 1)] for _ in range(2)]
+    top = [-1, -1]  # Highest possibly non-empty bucket of each side
+    for vertex in range(num_vertices):
+        index = gain[vertex] + max_gain
+        buckets[side[vertex]][index].add(vertex)
+        top[side[vertex]] = max(top[side[vertex]], index)
+
+    def violation(weight):
+        return max(bounds[0] - weight, weight - bounds[1], 0)
+
+    free = [True] * num_vertices
+    locked = [[0] * hypergraph.num_nets, [0] * hypergraph.num_nets]
+    side0_weight = sum(w for w, s in zip(vertex_weights, side) if s == 0)
+    moves, total, best, best_moves = [], 0, 0, 0
+    best_violation = violation(side0_weight)
+
+    def update(vertex, delta):
+        vertex_side = side[vertex]
+        index = gain[vertex] + max_gain
+        buckets[vertex_side][index].discard(vertex)
+        gain[vertex] += delta
+        buckets[vertex_side][index + delta].add(vertex)
+        if index + delta > top[vertex_side]:
+            top[vertex_side] = index + delta
+
+    while len(moves) - best_moves < stall_limit:
+        # Highest gain move of each side that keeps the balance
+        choice = None
+        for from_side in (0, 1):
+            bucket_list = buckets[from_side]
+            while top[from_side] >= 0 and not bucket_list[top[from_side]]:
+                top[from_side] -= 1
+            if top[from_side] < 0:
+                continue
+            vertex = next(iter(bucket_list[top[from_side]]))
+            weight = vertex_weights[vertex] if from_side == 1 else -vertex_weights[vertex]
+            after = violation(side0_weight + weight)
+            if (after == 0 or after < violation(side0_weight)) and (choice is None or gain[vertex] > gain[choice]):
+                choice = vertex
+        if choice is None:
+            break
+
+        vertex, from_side = choice, side[choice]
+        to_side = 1 - from_side
+        buckets[from_side][gain[vertex] + max_gain].discard(vertex)
+        free[vertex] = False
+        total += gain[vertex]
+        side0_weight += vertex_weights[vertex] if to_side == 0 else -vertex_weights[vertex]
+
+        from_counts, to_counts = counts[from_side], counts[to_side]
+        for net in vertex_nets[vertex]:
+            if locked[from_side][net] and locked[to_side][net]:
+                continue  # Locked pins on both sides: the net stays cut whatever moves
+            weight = net_weights[net]
+            net_vertices = net_pins[net_offsets[net]:net_offsets[net + 1]]
+            if to_counts[net] == 0:
+                for other in net_vertices:
+                    if free[other]:
+                        update(other, weight)
+            elif to_counts[net] == 1:
+                for other in net_vertices:
+                    if free[other] and side[other] == to_side:
+                        update(other, -weight)
+                        break
+            from_counts[net] -= 1
+            to_counts[net] += 1
+            if from_counts[net] == 0:
+                for other in net_vertices:
+                    if free[other]:
+                        update(other, -weight)
+            elif from_counts[net] == 1:
+                for other in net_vertices:
+                    if free[other] and side[other] == from_side and other != vertex:
+                        update(other, weight)
+                        break
+            locked[to_side][net] += 1
+        side[vertex] = to_side
+
+        moves.append(vertex)
+        # The best prefix is the most balanced one, then the one with the smallest cut
+        current_violation = violation(side0_weight)
+        if current_violation < best_violation or (current_violation == best_violation and total > best):
+            best, best_moves, best_violation = total, len(moves), current_violation
+
+    for vertex in moves[best_moves:]:
+        side[vertex] = 1 - side[vertex]
+    return best
+
+
+def fm_bisect(hypergraph, fraction=0.5, imbalance=0.05, seed=0, max_passes=8, stall_limit=None):
+    """
+    Splits a hypergraph in two, side 0 receiving fraction of the total vertex weight within imbalance of the total,
+    with a small weighted cut: graph growing for the initial split, then FM passes until one no longer improves
+    the cut. Vertices too heavy for the balance to be met leave the split as close to it as their moves allow.
+    Returns the side of every vertex.
+    """
+    rng = np.random.default_rng(seed)
+    total = sum(hypergraph.vertex_weights)
+    bounds = (fraction * total - imbalance * total, fraction * total + imbalance * total)
+    if stall_limit is None:
+        stall_limit = max(50, hypergraph.num_vertices // 10)
+
+    side = _grow_initial_side(hypergraph, fraction * total, rng)
+    for _ in range(max_passes):
+        gain = fm_pass(hypergraph, side, bounds, stall_limit)
+        side0_weight = sum(w for w, s in zip(hypergraph.vertex_weights, side) if s == 0)
+        if gain <= 0 and bounds[0] <= side0_weight <= bounds[1]:
+            break
+    return side
+
+
+def partition_tiers(netlist, num_tiers, imbalance=0.05, seed=0, max_passes=8):
+    """
+    Assigns every block of a netlist to one of num_tiers dies, with the block area of every die balanced within
+    imbalance and few nets across dies, by recursive FM bisection. Dies are split into contiguous ranges,
+    so nets cut at the first bisection tend to span neighbouring dies only. Returns an int array of tiers.
+    """
+    tiers = np.zeros(netlist.num_blocks, dtype=np.int64)
+
+    def split(hypergraph, vertices, first_tier, count, seed):
+        if count == 1 or not vertices:
+            tiers[vertices] = first_tier
+            return
+        lower = count // 2
+        side = fm_bisect(hypergraph, lower / count, imbalance / 2, seed, max_passes)
+        for part, part_tiers, part_first in ((0, lower, first_tier), (1, count - lower, first_tier + lower)):
+            members = [i for i, s in enumerate(side) if s == part]
+            split(hypergraph.subgraph(members), [vertices[i] for i in members], part_first, part_tiers,
+                  seed * 2 + part + 1)
+
+    split(Hypergraph.from_netlist(netlist), list(range(netlist.num_blocks)), 0, num_tiers, seed)
+    return tiers
+
+
+def tier_cut(netlist, tiers):
+    """Returns the number of nets spanning several tiers and the number of tier crossings (TSVs) they need."""
+    pins = netlist.net_pins
+    is_block = pins < netlist.num_blocks
+    pin_tiers = np.where(is_block, tiers[np.minimum(pins, netlist.num_blocks - 1)], -1)
+    net_of_pin = np.repeat(np.arange(netlist.num_nets), netlist.net_degrees)
+    low = np.full(netlist.num_nets, np.iinfo(np.int64).max)
+    high = np.full(netlist.num_nets, -1)
+    np.minimum.at(low, net_of_pin[is_block], pin_tiers[is_block])
+    np.maximum.at(high, net_of_pin[is_block], pin_tiers[is_block])
+    spans = np.where(high >= 0, high - low, 0)
+    return int(np.count_nonzero(spans)), int(spans.sum())
+
+
+def write_tiers(path, netlist, tiers):
+    """Writes a '<block name> <tier>' line per block."""
+    with open(path, 'w') as file:
+        file.writelines(f"{name} {tier}\n" for name, tier in zip(netlist.block_names, tiers.tolist()))
+
+
+def read_tiers(path, netlist):
+    """Reads the tiers written by write_tiers, by block name, into an array over the blocks of netlist."""
+    tiers = np.zeros(netlist.num_blocks, dtype=np.int64)
+    with open(path, 'r') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 2:
+                tiers[netlist.index(parts[0])] = int(parts[1])
+    return tiers
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Assign the blocks of refined netlists to 3D tiers.")
+    parser.add_argument("netlists", type=str, nargs="+", help="Refined netlist files.")
+    parser.add_argument("--tiers", type=int, default=2, help="Number of tiers (default: 2).")
+    parser.add_argument("--imbalance", type=float, default=0.05,
+                        help="Allowed deviation of the area of a tier, as a fraction of the total (default: 0.05).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the initial partitions (default: 0).")
+    parser.add_argument("--output-dir", type=str, default=None,
+                        help="Directory to write a <netlist>.tiers file per netlist to.")
+    args = parser.parse_args()
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for path in args.netlists:
+        netlist = Netlist.read_refined(path)
+        start = time.perf_counter()
+        tiers = partition_tiers(netlist, args.tiers, args.imbalance, args.seed)
+        elapsed = time.perf_counter() - start
+        cut, tsvs = tier_cut(netlist, tiers)
+        area = np.bincount(tiers, weights=netlist.width * netlist.height, minlength=args.tiers)
+        shares = ", ".join(f"{share:.1%}" for share in area / area.sum())
+        print(f"{path}: {cut} of {netlist.num_nets} nets cut, {tsvs} TSVs, tier areas {shares} ({elapsed:.2f} s)")
+        if args.output_dir:
+            name = os.path.splitext(os.path.basename(path))[0]
+            write_tiers(os.path.join(args.output_dir, name + ".tiers"), netlist, tiers)